@@ -1,11 +1,30 @@
 import csv
 import json
 import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+COLUMNAR_META = "meta.json"
 
 class TaskDataManager:
-    def __init__(self, csv_filename="tasks.csv", json_filename="tasks.json"):
+    JSON_FORMATS = ("array", "lines")
+
+    def __init__(self, csv_filename="tasks.csv", json_filename="tasks.json", json_format="array"):
+        """json_format "array" keeps tasks.json as one indented JSON array;
+        "lines" stores one task per line (JSON Lines) so append_task is a
+        single small write. load_from_json reads either format."""
+        if json_format not in self.JSON_FORMATS:
+            raise ValueError(f"json_format must be one of {self.JSON_FORMATS}")
         self.csv_filename = csv_filename
         self.json_filename = json_filename
+        self.json_format = json_format
+
+    @staticmethod
+    def task_to_dict(task):
+        return { "name": task.name, "duration": task.duration.total_seconds() / 3600,
+                 "due_date": task.due_date.strftime('%Y-%m-%d'), "priority": task.priority, "urgency": task.urgency}
 
     def save_to_csv(self, tasks):
         """Save tasks to a CSV file."""
@@ -17,27 +36,154 @@ class TaskDataManager:
 
     def save_to_json(self, tasks):
         """Save tasks to a JSON file."""
-        with open(self.json_filename, mode='w') as file:
-            json.dump([{ "name": task.name, "duration": task.duration.total_seconds() / 3600,
-                         "due_date": task.due_date.strftime('%Y-%m-%d'), "priority": task.priority, "urgency": task.urgency}
-                       for task in tasks], file, indent=4)
+        self._write_json([self.task_to_dict(task) for task in tasks], self.json_format)
+
+    def _write_json(self, records, json_format, filename=None):
+        with open(filename or self.json_filename, mode='w') as file:
+            if json_format == "lines":
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+            else:
+                json.dump(records, file, indent=4)
+
+    def _json_is_array(self):
+        """Peek at the first non-blank character: '[' means a JSON array file."""
+        with open(self.json_filename, mode='r') as file:
+            while True:
+                char = file.read(1)
+                if not char or not char.isspace():
+                    return char == "["
 
     def load_from_csv(self):
         """Load tasks from a CSV file."""
-        tasks = []
-        if os.path.exists(self.csv_filename):
-            with open(self.csv_filename, mode='r') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    tasks.append(row)
-        return tasks
+        return list(self.iter_csv())
+
+    @staticmethod
+    def _matches(record, due_after=None, due_before=None, priorities=None):
+        """Filter used while scanning. Dates compare as 'YYYY-MM-DD' strings,
+        bounds are inclusive."""
+        due_date = str(record.get("due_date", ""))[:10]
+        if due_after is not None and due_date < due_after:
+            return False
+        if due_before is not None and due_date > due_before:
+            return False
+        if priorities is not None and str(record.get("priority", "")).lower() not in priorities:
+            return False
+        return True
+
+    @staticmethod
+    def _filters(due_after, due_before, priorities):
+        def as_text(value):
+            if value is None or isinstance(value, str):
+                return value
+            return value.strftime('%Y-%m-%d')  # date or datetime
+        if isinstance(priorities, str):
+            priorities = (priorities,)
+        if priorities is not None:
+            priorities = {priority.lower() for priority in priorities}
+        return as_text(due_after), as_text(due_before), priorities
+
+    def iter_csv(self, due_after=None, due_before=None, priorities=None):
+        """Yield CSV rows one at a time, optionally only those due in
+        [due_after, due_before] or with one of the given priorities."""
+        if not os.path.exists(self.csv_filename):
+            return
+        filters = self._filters(due_after, due_before, priorities)
+        with open(self.csv_filename, mode='r', newline='') as file:
+            for row in csv.DictReader(file):
+                if self._matches(row, *filters):
+                    yield row
+
+    def iter_json(self, due_after=None, due_before=None, priorities=None):
+        """Yield JSON tasks one at a time with the same filters as iter_csv.
+
+        JSON Lines files are read line by line and JSON arrays are parsed
+        incrementally, so memory use does not grow with the file.
+        """
+        if not os.path.exists(self.json_filename):
+            return
+        filters = self._filters(due_after, due_before, priorities)
+        is_array = self._json_is_array()
+        with open(self.json_filename, mode='r') as file:
+            if is_array:
+                records = self._iter_json_array(file)
+            else:
+                records = (json.loads(line) for line in file if line.strip())
+            for record in records:
+                if self._matches(record, *filters):
+                    yield record
+
+    @staticmethod
+    def _iter_json_array(file, chunk_size=65536):
+        """Decode the elements of a top-level JSON array from a file in chunks.
+
+        A value is only accepted once the ',' or ']' after it has been read,
+        so a number split across two chunks is never cut short.
+        """
+        decoder = json.JSONDecoder()
+        buffer, pos, eof = "", 0, False
+
+        def read_more():
+            # Drop what was consumed and append the next chunk; False at end of file
+            nonlocal buffer, pos, eof
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return not eof
+
+        def next_char():
+            # Skip whitespace, reading as needed; '' at end of file
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not read_more():
+                    return ""
+
+        if next_char() != "[":
+            raise ValueError("Expected a JSON array")
+        pos += 1
+        if next_char() == "]":
+            return
+
+        while True:
+            if next_char() == "":
+                raise ValueError("Unterminated JSON array")
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not read_more():
+                        raise
+                    continue
+                while end < len(buffer) and buffer[end].isspace():
+                    end += 1
+                if end < len(buffer) and buffer[end] in ",]":
+                    break
+                # Either the value runs on into the next chunk or the input is malformed
+                if not read_more():
+                    if end < len(buffer):
+                        raise ValueError(f"Expected ',' or ']' after an array element, got {buffer[end]!r}")
+                    raise ValueError("Unterminated JSON array")
+
+            delimiter = buffer[end]
+            yield record
+            pos = end + 1
+            if delimiter == "]":
+                return
 
     def load_from_json(self):
-        """Load tasks from a JSON file."""
-        if os.path.exists(self.json_filename):
+        """Load tasks from a JSON file, either a JSON array or JSON Lines."""
+        if not os.path.exists(self.json_filename):
+            return []
+        if self._json_is_array():
             with open(self.json_filename, mode='r') as file:
                 return json.load(file)
-        return []
+        with open(self.json_filename, mode='r') as file:
+            return [json.loads(line) for line in file if line.strip()]
 
     def append_task(self, task):
         """Append a new task to both CSV and JSON files."""
@@ -48,12 +194,129 @@ class TaskDataManager:
             if not file_exists:
                 writer.writerow(["name", "duration", "due_date", "priority", "urgency"])  # Write header if new file
             writer.writerow([task.name, task.duration.total_seconds() / 3600, task.due_date.strftime('%Y-%m-%d'), task.priority, task.urgency])
-        
+
         # Append to JSON
+        if self.json_format == "lines":
+            if os.path.exists(self.json_filename) and self._json_is_array():
+                # One-time conversion of an array file (e.g. after compact_json)
+                self._write_json(self.load_from_json(), "lines")
+            with open(self.json_filename, mode='a') as file:
+                file.write(json.dumps(self.task_to_dict(task)) + "\n")
+            return
+
         tasks = self.load_from_json()
-        tasks.append({ "name": task.name, "duration": task.duration.total_seconds() / 3600,
-                       "due_date": task.due_date.strftime('%Y-%m-%d'), "priority": task.priority, "urgency": task.urgency})
-        self.save_to_json(tasks)
+        tasks.append(self.task_to_dict(task))
+        self._write_json(tasks, "array")
+
+    def compact_json(self, output_filename=None):
+        """Rewrite the JSON store as a single indented JSON array.
+
+        Writes to output_filename if given, otherwise replaces the JSON file
+        in place. In "lines" mode the next append_task converts it back.
+        """
+        tasks = self.load_from_json()
+        target = output_filename or self.json_filename
+        tmp_filename = f"{target}.tmp"
+        self._write_json(tasks, "array", tmp_filename)
+        os.replace(tmp_filename, target)
+        return len(tasks)
+
+    @staticmethod
+    def columnar_dir(source_filename):
+        """Where the columnar copy of a data file lives, e.g. tasks.csv -> tasks.columns/"""
+        return os.path.splitext(source_filename)[0] + ".columns"
+
+    @staticmethod
+    def source_stamp(source_filename):
+        """Size and mtime of a file, as recorded in columnar meta.json"""
+        stat = os.stat(source_filename)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def save_columnar(self, df, directory, source_filename=None, extra=None):
+        """Store a DataFrame as one .npy file per column plus meta.json.
+
+        Numeric columns are written as they are. Other columns are written as
+        int32 codes into a vocabulary kept in meta.json (-1 for missing).
+        With source_filename the source's size and mtime are recorded so
+        load_columnar can tell when the copy is stale. extra is stored in
+        meta.json as is.
+        """
+        tmp_directory = f"{directory}.tmp"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        meta = {"version": 1, "rows": len(df), "columns": [], "extra": extra}
+        if source_filename is not None:
+            meta["source"] = self.source_stamp(source_filename)
+        for i, name in enumerate(df.columns):
+            entry = {"name": str(name), "file": f"{i:03d}.npy"}
+            if pd.api.types.is_numeric_dtype(df[name]):
+                values = df[name].to_numpy()
+            else:
+                codes, vocabulary = pd.factorize(df[name])
+                values = codes.astype(np.int32)
+                entry["vocabulary"] = vocabulary.tolist()
+            np.save(os.path.join(tmp_directory, entry["file"]), np.ascontiguousarray(values))
+            meta["columns"].append(entry)
+        with open(os.path.join(tmp_directory, COLUMNAR_META), mode='w') as file:
+            json.dump(meta, file, indent=4)
+
+        # Swap directories so readers never see a half-written copy
+        old_directory = f"{directory}.old"
+        shutil.rmtree(old_directory, ignore_errors=True)
+        if os.path.exists(directory):
+            os.replace(directory, old_directory)
+        os.replace(tmp_directory, directory)
+        shutil.rmtree(old_directory, ignore_errors=True)
+        return meta
+
+    @staticmethod
+    def columnar_meta(directory):
+        """meta.json of a columnar copy, or None if there is no readable copy"""
+        try:
+            with open(os.path.join(directory, COLUMNAR_META), mode='r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def touch_columnar(self, directory, source_filename):
+        """Record the source's current size and mtime in an existing copy,
+        for when the source was rewritten with the same content."""
+        meta = self.columnar_meta(directory)
+        meta["source"] = self.source_stamp(source_filename)
+        meta_filename = os.path.join(directory, COLUMNAR_META)
+        with open(f"{meta_filename}.tmp", mode='w') as file:
+            json.dump(meta, file, indent=4)
+        os.replace(f"{meta_filename}.tmp", meta_filename)
+        return meta
+
+    def load_columnar(self, directory, source_filename=None, mmap_mode='r', extra=None):
+        """Read a copy written by save_columnar as a DataFrame.
+
+        Numeric columns are memory-mapped rather than parsed. Returns None if
+        there is no copy, if it was made from a different version of
+        source_filename, or if its extra does not match the one given.
+        """
+        meta = self.columnar_meta(directory)
+        if meta is None:
+            return None
+        if source_filename is not None:
+            try:
+                if meta.get("source") != self.source_stamp(source_filename):
+                    return None
+            except OSError:
+                return None
+        if extra is not None and meta.get("extra") != extra:
+            return None
+
+        columns = {}
+        for entry in meta["columns"]:
+            values = np.load(os.path.join(directory, entry["file"]), mmap_mode=mmap_mode)
+            if "vocabulary" in entry:
+                vocabulary = np.array(entry["vocabulary"] + [np.nan], dtype=object)
+                values = vocabulary[values]  # code -1 picks the trailing NaN
+            columns[entry["name"]] = values
+        return pd.DataFrame(columns, copy=False)
 
     def save_tasks(self, tasks):
         self.save_to_csv(tasks)
@@ -61,5 +324,5 @@ class TaskDataManager:
 
     def load_tasks(self):
         return self.load_from_csv(), self.load_from_json()
-    
-    
\ No newline at end of file
+
+
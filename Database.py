@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+from flask import g, current_app
+
+# PRAGMA settings applied to every new connection. journal_mode is stored in
+# the database file; the others only last for the connection.
+PRAGMA_PROFILES = {
+    # sqlite3 defaults: rollback journal, synchronous=FULL
+    'default': {},
+    # Readers don't block on the writer, commits skip the fsync per transaction
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+        'cache_size': -16000   # negative = KiB, so ~16MB page cache
+    },
+    # WAL concurrency, but still fsync on every commit
+    'wal_durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'cache_size': -16000
+    }
+}
+
+
+def apply_pragmas(conn, profile):
+    for name, value in PRAGMA_PROFILES[profile].items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+def add_missing_columns(conn, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, definition) the table doesn't have yet.
+
+    Lets init_db() bring databases created by older versions of the schema
+    up to date.
+    """
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+
+class ConnectionPool:
+    """Keeps idle SQLite connections around so requests don't reconnect.
+
+    sqlite3 caches compiled statements per connection (keyed by the SQL
+    text), so reusing connections also reuses the prepared statements for
+    the queries TaskApp runs on every request.
+    """
+
+    def __init__(self, database, profile='default', max_idle=8, cached_statements=128):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown database profile: {profile}")
+        self.database = database
+        self.profile = profile
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self.connects = 0  # Number of real sqlite3.connect() calls
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def connect(self):
+        """Open a new connection configured the way the app expects"""
+        conn = sqlite3.connect(
+            self.database,
+            check_same_thread=False,  # Connections move between request threads
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, self.profile)
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's connections are not ours to use
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+            self.connects += 1
+        return self.connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def init_app(app, pool):
+    """Attach a pool to the app and return connections at the end of each request"""
+    app.extensions['sqlite_pool'] = pool
+    app.teardown_appcontext(close_db)
+
+
+def get_db():
+    """The connection for the current request, checked out on first use"""
+    if 'db' not in g:
+        g.db = current_app.extensions['sqlite_pool'].acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        current_app.extensions['sqlite_pool'].release(conn)
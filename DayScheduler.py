@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+import math
+import numpy as np
+
+# Task model used by the day planner
+class Task:
+    PRIORITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3}
+    
+    def __init__(self, name, priority, category, duration, urgency=0.5):
+        self.name = name
+        self.priority = priority
+        self.category = category
+        self.duration = duration  # in minutes
+        self.urgency = urgency  # 0-1
+        self.weight = self.PRIORITY_WEIGHTS[priority]
+
+
+class DayScheduler:
+    """Picks which tasks fit into the available time and lays them out from 9 AM.
+
+    Modes:
+      greedy      - highest priority first, take whatever still fits
+      exact       - 0/1 knapsack over whole minutes, maximizes total value;
+                    ValueError when tasks x minutes exceeds EXACT_MAX_CELLS
+      approximate - value-per-minute greedy, or the single best task if that
+                    is worth more; always at least half the optimum
+      auto        - exact while tasks x minutes stays under EXACT_MAX_CELLS,
+                    approximate beyond that
+
+    A task's value is its priority weight, or weight x urgency with
+    value='weight_urgency'.
+    """
+    MODES = ('greedy', 'exact', 'approximate', 'auto')
+    VALUES = ('weight', 'weight_urgency')
+    EXACT_MAX_CELLS = 5_000_000  # size of the knapsack decision table
+    MAX_HOURS = 24  # a day plan
+
+    def __init__(self, tasks, available_hours, mode='greedy', value='weight'):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid scheduling mode: {mode}")
+        if value not in self.VALUES:
+            raise ValueError(f"Invalid task value: {value}")
+        available_hours = float(available_hours)
+        if not (math.isfinite(available_hours) and 0 < available_hours <= self.MAX_HOURS):
+            raise ValueError(f"Available hours must be more than 0 and at most {self.MAX_HOURS}")
+        self.tasks = sorted(tasks, key=lambda x: x.weight, reverse=True)
+        self.available_minutes = available_hours * 60
+        self.mode = mode
+        self.value = value
+
+    def task_value(self, task):
+        if self.value == 'weight_urgency':
+            return task.weight * task.urgency
+        return task.weight
+
+    def select_greedy(self):
+        chosen = []
+        remaining_time = self.available_minutes
+        for i, task in enumerate(self.tasks):
+            if task.duration <= remaining_time:
+                chosen.append(i)
+                remaining_time -= task.duration
+        return chosen
+
+    def select_exact(self):
+        """Optimal 0/1 knapsack on minute granularity, O(tasks x minutes)"""
+        capacity = int(self.available_minutes)
+        best = np.zeros(capacity + 1)  # best[c] = max value using at most c minutes
+        taken = np.zeros((len(self.tasks), capacity + 1), dtype=bool)
+        minutes = [math.ceil(task.duration) for task in self.tasks]
+
+        for i, task in enumerate(self.tasks):
+            d = minutes[i]
+            if d > capacity:
+                continue
+            candidate = best[:capacity + 1 - d] + self.task_value(task)
+            improved = candidate > best[d:]
+            taken[i, d:] = improved
+            best[d:] = np.where(improved, candidate, best[d:])
+
+        # Walk the decisions back from full capacity
+        chosen = []
+        c = capacity
+        for i in range(len(self.tasks) - 1, -1, -1):
+            if taken[i, c]:
+                chosen.append(i)
+                c -= minutes[i]
+        return sorted(chosen)
+
+    def select_approximate(self):
+        """Density greedy vs. best single task, O(n log n), >= half of optimal"""
+        # Same whole-minute durations as select_exact, so the two are comparable
+        capacity = int(self.available_minutes)
+        minutes = [max(math.ceil(task.duration), 1) for task in self.tasks]
+        fitting = [i for i in range(len(self.tasks)) if minutes[i] <= capacity]
+        by_density = sorted(fitting, reverse=True,
+                            key=lambda i: self.task_value(self.tasks[i]) / minutes[i])
+
+        chosen = []
+        remaining_time = capacity
+        for i in by_density:
+            if minutes[i] <= remaining_time:
+                chosen.append(i)
+                remaining_time -= minutes[i]
+
+        if fitting:
+            best_single = max(fitting, key=lambda i: self.task_value(self.tasks[i]))
+            if self.task_value(self.tasks[best_single]) > self.total_value(chosen):
+                chosen = [best_single]
+        return sorted(chosen)
+
+    def total_value(self, chosen):
+        return sum(self.task_value(self.tasks[i]) for i in chosen)
+
+    def select(self):
+        mode = self.mode
+        cells = len(self.tasks) * (int(self.available_minutes) + 1)
+        if mode == 'auto':
+            mode = 'exact' if cells <= self.EXACT_MAX_CELLS else 'approximate'
+        elif mode == 'exact' and cells > self.EXACT_MAX_CELLS:
+            raise ValueError(f"Too many tasks for exact scheduling ({cells} cells, limit "
+                             f"{self.EXACT_MAX_CELLS}); use 'auto' or 'approximate'")
+        if mode == 'exact':
+            return mode, self.select_exact()
+        if mode == 'approximate':
+            return mode, self.select_approximate()
+        return mode, self.select_greedy()
+        
+    def create_schedule(self):
+        mode, chosen = self.select()
+        greedy_value = self.total_value(chosen if mode == 'greedy' else self.select_greedy())
+
+        scheduled = []
+        remaining_time = self.available_minutes
+        current_time = datetime.now().replace(hour=9, minute=0)  # Start at 9 AM
+        
+        for i in chosen:
+            task = self.tasks[i]
+            end_time = current_time + timedelta(minutes=task.duration)
+            scheduled.append({
+                'name': task.name,
+                'start': current_time.strftime('%H:%M'),
+                'end': end_time.strftime('%H:%M'),
+                'duration': f'{int(task.duration)} mins',
+                'priority': task.priority.capitalize(),
+                'category': task.category.capitalize(),
+                'urgency': task.urgency
+            })
+            current_time = end_time
+            remaining_time -= task.duration
+        
+        return {
+            'scheduled_tasks': scheduled,
+            'total_scheduled': len(scheduled),
+            'remaining_time': f'{int(remaining_time // 60)}h {int(remaining_time % 60)}m',
+            'mode': mode,
+            'total_value': self.total_value(chosen),
+            'greedy_value': greedy_value
+        }
@@ -0,0 +1,88 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, Prometheus' default latency buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values.
+
+    observe() is a bisect plus a few integer additions under a lock, cheap
+    enough to run on every request.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ','.join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {series[-1]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Histograms and gauges for one process, rendered in Prometheus text format.
+
+    Each worker process keeps its own numbers; scrape every worker, or run
+    a single worker per scrape target.
+    """
+
+    def __init__(self, prefix='taskmate'):
+        self.prefix = prefix
+        self._histograms = {}
+        self._gauges = []  # (name, help, type, callback)
+        self.spans = self.histogram('span_duration_seconds', 'Time spent in named code spans', ('span',))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        full_name = f"{self.prefix}_{name}"
+        if full_name not in self._histograms:
+            self._histograms[full_name] = Histogram(full_name, help, labels, buckets)
+        return self._histograms[full_name]
+
+    def gauge(self, name, help, callback, type='gauge'):
+        """Report callback()'s value at scrape time (type='counter' for running totals)"""
+        self._gauges.append((f"{self.prefix}_{name}", help, type, callback))
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.observe(time.perf_counter() - started, name)
+
+    def render(self):
+        lines = []
+        for histogram in self._histograms.values():
+            lines.extend(histogram.render())
+        for name, help, type, callback in self._gauges:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}", f"{name} {float(callback())}"]
+        return '\n'.join(lines) + '\n'
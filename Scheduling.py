@@ -1,21 +1,304 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from bisect import bisect_left, bisect_right
+import heapq
+import itertools
 from task import Task
 
+
+class Calendar:
+    """Free time as a sorted list of non-overlapping slots.
+
+    Working windows are added with add_window() and meetings or breaks are
+    cut out with block(). A max segment tree over the slot lengths lets
+    find_slot() return the earliest start that fits a duration in O(log n),
+    and reserving time at the start of a slot updates it in O(log n), so
+    placing thousands of tasks over weeks of windows never rescans the
+    whole day. Changes that add or split slots rebuild the tree on the next
+    lookup.
+    """
+
+    def __init__(self, windows=()):
+        self.starts = []  # slot starts, sorted
+        self.ends = []    # slot ends, same order
+        self._tree = None
+        for start, end in windows:
+            self.add_window(start, end)
+
+    def add_window(self, start, end):
+        """Make [start, end) free, merging with any slot it touches"""
+        if end <= start:
+            return
+        lo = bisect_left(self.ends, start)     # first slot ending at or after start
+        hi = bisect_right(self.starts, end)    # slots starting after end are untouched
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+        self._tree = None
+
+    def block(self, start, end):
+        """Remove [start, end) from the free time (a meeting, a break...)"""
+        if end <= start:
+            return
+        lo = bisect_right(self.ends, start)    # first slot ending after start
+        hi = bisect_left(self.starts, end)     # slots starting at or after end are untouched
+        if lo >= hi:
+            return
+        new_starts, new_ends = [], []
+        if self.starts[lo] < start:
+            new_starts.append(self.starts[lo])
+            new_ends.append(start)
+        if self.ends[hi - 1] > end:
+            new_starts.append(end)
+            new_ends.append(self.ends[hi - 1])
+        self.starts[lo:hi] = new_starts
+        self.ends[lo:hi] = new_ends
+        self._tree = None
+
+    def free_slots(self):
+        return [(s, e) for s, e in zip(self.starts, self.ends) if e > s]
+
+    def _length(self, i):
+        return self.ends[i] - self.starts[i]
+
+    def _build_tree(self):
+        # Drop slots used up by reserve()
+        slots = self.free_slots()
+        self.starts = [s for s, _ in slots]
+        self.ends = [e for _, e in slots]
+        size = 1
+        while size < max(len(slots), 1):
+            size *= 2
+        self._size = size
+        self._tree = [None] * (2 * size)  # None = no slot
+        for i in range(len(slots)):
+            self._tree[size + i] = self._length(i)
+        for node in range(size - 1, 0, -1):
+            self._tree[node] = self._max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    @staticmethod
+    def _max(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a >= b else b
+
+    def _update(self, i):
+        node = self._size + i
+        self._tree[node] = self._length(i)
+        node //= 2
+        while node:
+            self._tree[node] = self._max(self._tree[2 * node], self._tree[2 * node + 1])
+            node //= 2
+
+    def _leftmost(self, lo, duration, node=1, node_lo=0, node_hi=None):
+        """Smallest slot index >= lo whose length is at least duration, or -1"""
+        if node_hi is None:
+            node_hi = self._size
+        longest = self._tree[node]
+        if node_hi <= lo or longest is None or longest < duration:
+            return -1
+        if node_hi - node_lo == 1:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self._leftmost(lo, duration, 2 * node, node_lo, mid)
+        if found == -1:
+            found = self._leftmost(lo, duration, 2 * node + 1, mid, node_hi)
+        return found
+
+    def find_slot(self, duration, earliest=None, latest_end=None):
+        """Earliest start where duration fits, not before earliest and ending
+        by latest_end. Returns None if there is no such time."""
+        if self._tree is None:
+            self._build_tree()
+
+        lo = 0
+        if earliest is not None:
+            lo = bisect_right(self.ends, earliest)  # first slot ending after earliest
+            if lo < len(self.starts) and self.starts[lo] < earliest:
+                # Slot already running at `earliest`: only its tail is usable
+                if self.ends[lo] - earliest >= duration:
+                    return self._check_end(earliest, duration, latest_end)
+                lo += 1
+
+        i = self._leftmost(lo, duration)
+        if i == -1:
+            return None
+        return self._check_end(self.starts[i], duration, latest_end)
+
+    @staticmethod
+    def _check_end(start, duration, latest_end):
+        if latest_end is not None and start + duration > latest_end:
+            return None  # The earliest fit is too late, so every later one is too
+        return start
+
+    def reserve(self, start, duration):
+        """Mark [start, start + duration) as taken; it must lie in one free slot"""
+        i = bisect_right(self.starts, start) - 1
+        end = start + duration
+        if i < 0 or end > self.ends[i]:
+            raise ValueError("Reserved time is not free")
+        if start == self.starts[i]:
+            # Common case: taking time off the front keeps slot indexes stable
+            self.starts[i] = end
+            if self._tree is not None:
+                self._update(i)
+        else:
+            self.block(start, end)
+
+    def place_tasks(self, tasks, duration=lambda task: task.time):
+        """Put each task, most urgent first, into the earliest slot that fits.
+
+        Returns (placed, unplaced) with placed as (task, start, end) tuples.
+        """
+        placed, unplaced = [], []
+        for task in sorted(tasks, key=lambda x: x.urgency, reverse=True):
+            length = duration(task)
+            start = self.find_slot(length)
+            if start is None:
+                unplaced.append(task)
+                continue
+            self.reserve(start, length)
+            placed.append((task, start, start + length))
+        return placed, unplaced
+
+
 class Scheduler:
-    def __init__(self, tasks, start_time, end_time):
-        self.tasks = tasks
-        self.breaks = False
+    def __init__(self, tasks, start_time, end_time, clock=None):
+        # Tasks live in a heap of [-urgency, sequence, task] entries, so the most
+        # urgent task is always at the front. Removed or re-prioritized tasks
+        # leave their old entry behind with task set to None.
+        self._heap = []
+        self._entries = {}  # id(task) -> live heap entry
+        self._sequence = itertools.count()  # Keeps insertion order among equal urgencies
+        self._due_buckets = {}  # due_date -> {id(task): task}
+        self._bucket_days = {}  # due_date -> days until due used for its urgencies
+        self.clock = clock or datetime.today()
+        for task in tasks:
+            self.add_task(task)
+
+        self.breaks = []  # Blocked (start, end) intervals inside the windows
         self.start_time = start_time
         self.end_time = end_time
+        self.windows = [(start_time, end_time)]  # Free time; add_window() extends it over days
+
+    def add_window(self, start_time, end_time):
+        self.windows.append((start_time, end_time))
+        self.end_time = max(self.end_time, end_time)
+
+    def add_break(self, start_time, end_time):
+        self.breaks.append((start_time, end_time))
+
+    def build_calendar(self):
+        calendar = Calendar(self.windows)
+        for start_time, end_time in self.breaks:
+            calendar.block(start_time, end_time)
+        return calendar
+
+    @property
+    def tasks(self):
+        '''Live tasks, most urgent first'''
+        return [entry[2] for entry in sorted(self._heap) if entry[2] is not None]
+
+    def __len__(self):
+        return len(self._entries)
 
     def add_task(self, task):
-        self.tasks.append(task)
+        '''Add a task in O(log n)'''
+        due_date = getattr(task, 'due_date', None)
+        if due_date is not None:
+            task.urgency = task.calculate_urgency(self.clock)
+            self._due_buckets.setdefault(due_date, {})[id(task)] = task
+            self._bucket_days.setdefault(due_date, self._days_until(due_date))
+        self._push(task)
+
+    def remove_task(self, task):
+        '''Remove a task in O(1); its heap entry is skipped when it reaches the top'''
+        self._entries[id(task)][2] = None
+        self._forget(task)
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._rebuild_heap()
+
+    def update_priority(self, task, priority):
+        '''Change a task's priority and move it to its new place in O(log n)'''
+        task.priority = Task.validate_priority(priority)
+        task.urgency = task.calculate_urgency(self.clock)
+        self._entries[id(task)][2] = None
+        self._push(task)
+
+    def peek_task(self):
+        '''Most urgent task without removing it, or None'''
+        self._drop_removed()
+        return self._heap[0][2] if self._heap else None
+
+    def pop_task(self):
+        '''Remove and return the most urgent task, or None'''
+        self._drop_removed()
+        if not self._heap:
+            return None
+        task = heapq.heappop(self._heap)[2]
+        self._forget(task)
+        return task
+
+    def advance_clock(self, now=None):
+        '''Move the scheduler's "today" forward and refresh urgencies that went stale.
+
+        Urgency only depends on whole days until the due date (at least 1), so
+        tasks are grouped by due date and a group is only recomputed when its
+        day count changes. Advancing within the same day touches no task, and
+        overdue or due-tomorrow groups never change again. Returns how many
+        tasks were updated.
+        '''
+        self.clock = now or datetime.today()
+        changed = []
+        for due_date, bucket in self._due_buckets.items():
+            days = self._days_until(due_date)
+            if self._bucket_days.get(due_date) == days:
+                continue
+            self._bucket_days[due_date] = days
+            for task in bucket.values():
+                task.urgency = task.calculate_urgency(self.clock)
+                changed.append(task)
+
+        if len(changed) * 4 > len(self._entries):
+            # Most of the heap moved: fix the keys in place and heapify in O(n)
+            for task in changed:
+                self._entries[id(task)][0] = -task.urgency
+            self._rebuild_heap()
+        else:
+            for task in changed:
+                self._entries[id(task)][2] = None
+                self._push(task)
+        return len(changed)
+
+    def _forget(self, task):
+        del self._entries[id(task)]
+        due_date = getattr(task, 'due_date', None)
+        if due_date is not None:
+            self._due_buckets[due_date].pop(id(task), None)
+
+    def _days_until(self, due_date):
+        return max((due_date - self.clock).days, 1)
+
+    def _push(self, task):
+        entry = [-task.urgency, next(self._sequence), task]
+        self._entries[id(task)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+    def _rebuild_heap(self):
+        self._heap = [entry for entry in self._heap if entry[2] is not None]
+        heapq.heapify(self._heap)
 
     def sort_tasks(self):
-        self.tasks.sort(key=lambda x: x.urgency, reverse=True)  # Sort tasks by urgency
+        '''Tasks are always kept in urgency order by the heap; nothing to sort'''
 
     def schedule_tasks(self):
-        self.sort_tasks()
         for task in self.tasks:
             print(f"Task: {task.name}, Urgency: {task.urgency}, Due Date: {task.due_date}")
 
@@ -38,17 +321,88 @@ class Scheduler:
         incomplete_tasks = []  # Tasks that cannot be completed
         completed_tasks = []   # Tasks that can be completed
 
-        current_time = self.start_time  # Track task start time
+        # Free slots between breaks, each task goes into the earliest one it fits
+        calendar = self.build_calendar()
 
         for task in list(self.tasks):  # Iterate over a copy of the list to avoid issues
             task_duration = task.time  # Convert task time to timedelta
+            start_time = calendar.find_slot(task_duration)
 
-            if self.fits_in_time_slot(task, current_time):
-                print(f"'{task.name}' will start at {current_time.strftime('%H:%M')}")
-                current_time += task_duration
+            if start_time is not None:
+                calendar.reserve(start_time, task_duration)
+                print(f"'{task.name}' will start at {start_time.strftime('%H:%M')}")
                 completed_tasks.append(task)
-                print(f"'{task.name}' will end at {current_time.strftime('%H:%M')}")
+                print(f"'{task.name}' will end at {(start_time + task_duration).strftime('%H:%M')}")
             else:
                 incomplete_tasks.append(task)
 
-        return completed_tasks, incomplete_tasks
\ No newline at end of file
+        return completed_tasks, incomplete_tasks
+
+class MultiDayPlanner:
+    '''Spreads a backlog over several days, earliest deadline first.
+
+    Each day from start_date contributes a working window (day_start to
+    day_end, minus daily breaks) to one Calendar. Tasks are taken in order
+    of due date, higher priority first on the same date, and each goes into
+    the earliest slot that ends by the end of its due day. Tasks that cannot
+    make it are placed afterwards, in the earliest time left, so they never
+    take room from a task that could still be on time. O(n log n) overall.
+    '''
+
+    def __init__(self, start_date, days=7, day_start=time(9, 0), day_end=time(17, 0), breaks=()):
+        self.start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+        self.days = days
+        self.day_start = day_start
+        self.day_end = day_end
+        self.breaks = list(breaks)  # (start time, end time) pairs repeated every day
+
+    def build_calendar(self):
+        calendar = Calendar()
+        for offset in range(self.days):
+            day = self.start_date + timedelta(days=offset)
+            calendar.add_window(datetime.combine(day, self.day_start), datetime.combine(day, self.day_end))
+            for break_start, break_end in self.breaks:
+                calendar.block(datetime.combine(day, break_start), datetime.combine(day, break_end))
+        return calendar
+
+    def deadline(self, task):
+        '''Tasks may be worked on through the end of their due day'''
+        return datetime.combine(task.due_date.date(), self.day_end)
+
+    def plan(self, tasks, duration=lambda task: task.time, place_late=True):
+        '''Plan tasks over the horizon.
+
+        Returns a dict with 'scheduled' and 'late' lists of (task, start, end),
+        'unscheduled' tasks that found no room at all, and 'missed', every
+        task that will not be done by its deadline (late + unscheduled).
+        '''
+        calendar = self.build_calendar()
+        order = sorted(enumerate(tasks), key=lambda item: (
+            item[1].due_date, -Task.PRIORITY_MAP.get(item[1].priority, 1), item[0]))
+
+        scheduled, missed = [], []
+        for _, task in order:
+            length = duration(task)
+            start = calendar.find_slot(length, latest_end=self.deadline(task))
+            if start is None:
+                missed.append(task)
+                continue
+            calendar.reserve(start, length)
+            scheduled.append((task, start, start + length))
+
+        late, unscheduled = [], []
+        for task in missed:
+            length = duration(task)
+            start = calendar.find_slot(length) if place_late else None
+            if start is None:
+                unscheduled.append(task)
+                continue
+            calendar.reserve(start, length)
+            late.append((task, start, start + length))
+
+        return {
+            'scheduled': sorted(scheduled, key=lambda item: item[1]),
+            'late': sorted(late, key=lambda item: item[1]),
+            'unscheduled': unscheduled,
+            'missed': missed
+        }
@@ -1,10 +1,20 @@
-from flask import Flask, request, render_template, redirect, url_for, flash
+from flask import Flask, request, render_template, redirect, url_for, flash, jsonify, Response, stream_with_context, g
+from flask import before_render_template, template_rendered
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime
 from TaskDurationPredictor import TaskDurationPredictor
+from LRUCache import LRUCache
+from UserModels import UserModelStore
+from DayScheduler import DayScheduler, Task
+from Metrics import MetricsRegistry
+from Database import ConnectionPool, get_db, add_missing_columns
+import Database
 import sqlite3
 import logging
+import json
+import math
+import time
 from contextlib import closing
 
 # Initialize Flask app
@@ -17,10 +27,69 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # Initialize task predictor
+# Workers forked after load_predictor() below share the loaded forest
+# copy-on-write; that is the only sharing (sklearn copies tree arrays on load)
+MODEL_RELOAD_INTERVAL = 30  # seconds between checks for a retrained task_model.pkl
 predictor = TaskDurationPredictor()
 
 # Database configuration
 DATABASE = 'tasks.db'
+DATABASE_PROFILE = 'wal'  # See Database.PRAGMA_PROFILES
+db_pool = ConnectionPool(DATABASE, profile=DATABASE_PROFILE)
+Database.init_app(app, db_pool)
+
+# Users loaded by Flask-Login, so authenticated requests skip the users table
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 300  # seconds
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Per-user corrections to predicted durations, rebuilt by TrainingPipeline
+USER_MODEL_DIR = 'user_models'
+USER_MODEL_CACHE_SIZE = 1024  # users whose overlay is kept in memory
+USER_MODEL_TTL = 600  # seconds before a cached overlay is re-read from disk
+user_models = UserModelStore(USER_MODEL_DIR, maxsize=USER_MODEL_CACHE_SIZE, ttl=USER_MODEL_TTL)
+
+# Request latency and named spans, exposed at /metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('request_duration_seconds', 'Request latency by endpoint',
+                                    ('endpoint', 'method', 'status'))
+metrics.gauge('user_cache_hits_total', 'User cache hits', lambda: user_cache.hits, type='counter')
+metrics.gauge('user_cache_misses_total', 'User cache misses', lambda: user_cache.misses, type='counter')
+metrics.gauge('user_cache_size', 'Users in the cache', lambda: len(user_cache))
+metrics.gauge('user_model_cache_hits_total', 'User overlay cache hits', lambda: user_models.cache.hits, type='counter')
+metrics.gauge('user_model_cache_misses_total', 'User overlay cache misses', lambda: user_models.cache.misses, type='counter')
+metrics.gauge('user_model_cache_size', 'User overlays in the cache', lambda: len(user_models.cache))
+metrics.gauge('db_connects_total', 'SQLite connections opened', lambda: db_pool.connects, type='counter')
+metrics.gauge('model_ready', '1 once the duration model is loaded', lambda: predictor.ready)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        request_latency.observe(time.perf_counter() - started,
+                                request.endpoint or 'unknown', request.method, response.status_code)
+    return response
+
+# Every render_template call is timed through Flask's template signals
+def start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+def record_render_time(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None:
+        metrics.spans.observe(time.perf_counter() - started, 'render_template')
+
+before_render_template.connect(start_render_timer, app)
+template_rendered.connect(record_render_time, app)
+
+# History pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_STREAM_CHUNK = 500  # rows fetched per step when streaming /api/history
 
 # User model
 class User(UserMixin):
@@ -28,20 +97,10 @@ class User(UserMixin):
         self.id = id
         self.username = username
 
-# Task model
-class Task:
-    PRIORITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3}
-    
-    def __init__(self, name, priority, category, duration):
-        self.name = name
-        self.priority = priority
-        self.category = category
-        self.duration = duration  # in minutes
-        self.weight = self.PRIORITY_WEIGHTS[priority]
-
 # Database initialization
 def init_db():
-    with closing(sqlite3.connect(DATABASE)) as conn:
+    # The pool's connect() applies the profile, which switches the file to WAL
+    with closing(db_pool.connect()) as conn:
         with conn:
             # Users table
             conn.execute('''
@@ -65,9 +124,31 @@ def init_db():
                     start_time TEXT,
                     end_time TEXT,
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    urgency REAL,
+                    actual_duration INTEGER,
+                    completed_at TEXT,
                     FOREIGN KEY (user_id) REFERENCES users (id)
                 )
             ''')
+            # Databases from before user accounts (or completion tracking) lack these columns
+            add_missing_columns(conn, 'tasks', [
+                ('user_id', 'INTEGER REFERENCES users (id)'),
+                ('urgency', 'REAL'),
+                ('actual_duration', 'INTEGER'),  # minutes, set by /tasks/<id>/complete
+                ('completed_at', 'TEXT')
+            ])
+            
+            # Serves /history's filter and sort order straight from the index
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_user_date_time
+                ON tasks (user_id, scheduled_date DESC, start_time ASC)
+            ''')
+            
+            # TrainingPipeline reads completed tasks in completion order
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_completed
+                ON tasks (completed_at, id) WHERE actual_duration IS NOT NULL
+            ''')
             
             # Create default admin if none exists
             if not conn.execute('SELECT 1 FROM users WHERE username = "admin"').fetchone():
@@ -79,15 +160,53 @@ def init_db():
 # Initialize database
 init_db()
 
+# Load the model eagerly, before gunicorn (--preload) forks its workers,
+# so no request pays the unpickling cost
+def load_predictor():
+    try:
+        predictor.load_model()
+    except Exception as e:
+        logging.error(f"Error loading model: {str(e)}")
+
+load_predictor()
+
+# Each worker watches the model file and hot-swaps retrained models
+@app.before_request
+def start_model_watcher():
+    predictor.ensure_reload_watcher(MODEL_RELOAD_INTERVAL)
+
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    with closing(sqlite3.connect(DATABASE)) as conn:
-        conn.row_factory = sqlite3.Row
-        user = conn.execute(
+    user = user_cache.get(str(user_id))
+    if user is None:
+        row = get_db().execute(
             'SELECT * FROM users WHERE id = ?', (user_id,)
         ).fetchone()
-    return User(user['id'], user['username']) if user else None
+        if row is None:
+            return None
+        user = User(row['id'], row['username'])
+        user_cache.put(str(user_id), user)
+    return user
+
+# Machine clients get a JSON 401 instead of a redirect to the login page
+@login_manager.unauthorized_handler
+def unauthorized():
+    if request.path.startswith('/api/'):
+        return jsonify(error='Authentication required'), 401
+    flash(login_manager.login_message, login_manager.login_message_category)
+    return redirect(url_for(login_manager.login_view, next=request.url))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Readiness probe for load balancers
+@app.route('/ready')
+def ready():
+    if predictor.ready:
+        return jsonify(status='ready')
+    return jsonify(status='loading'), 503
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -96,14 +215,14 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        with closing(sqlite3.connect(DATABASE)) as conn:
-            conn.row_factory = sqlite3.Row
-            user = conn.execute(
-                'SELECT * FROM users WHERE username = ?', (username,)
-            ).fetchone()
+        user = get_db().execute(
+            'SELECT * FROM users WHERE username = ?', (username,)
+        ).fetchone()
         
         if user and check_password_hash(user['password_hash'], password):
-            login_user(User(user['id'], user['username']))
+            logged_in = User(user['id'], user['username'])
+            user_cache.put(str(user['id']), logged_in)
+            login_user(logged_in)
             return redirect(url_for('home'))
         
         flash('Invalid username or password')
@@ -112,6 +231,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(str(current_user.id))
     logout_user()
     return redirect(url_for('login'))
 
@@ -122,11 +242,13 @@ def register():
         password = generate_password_hash(request.form['password'])
         
         try:
-            with closing(sqlite3.connect(DATABASE)) as conn:
-                conn.execute(
+            with get_db() as conn:
+                cursor = conn.execute(
                     'INSERT INTO users (username, password_hash) VALUES (?, ?)',
                     (username, password)
                 )
+            # Drop anything cached under a reused id
+            user_cache.invalidate(str(cursor.lastrowid))
             flash('Registration successful! Please login.')
             return redirect(url_for('login'))
         except sqlite3.IntegrityError:
@@ -148,26 +270,32 @@ def plan():
         try:
             total_tasks = int(request.form.get('total_tasks', 1))
             available_hours = float(request.form.get('time_period', 8))
+            scheduling_mode = request.form.get('scheduling_mode', 'greedy')
             
-            tasks = []
-            for i in range(total_tasks):
-                task_input = {
+            with metrics.span('form_parsing'):
+                task_inputs = [{
+                    'name': request.form.get(f'task_name_{i}').strip(),
                     'priority': request.form.get(f'priority_{i}'),
                     'category': request.form.get(f'category_{i}'),
                     'urgency': 0.5
-                }
-                
-                duration = predictor.predict_duration(task_input)
-                
-                tasks.append(Task(
-                    name=request.form.get(f'task_name_{i}').strip(),
-                    priority=task_input['priority'],
-                    category=task_input['category'],
-                    duration=duration
-                ))
-
-            scheduler = DayScheduler(tasks, available_hours)
-            schedule = scheduler.create_schedule()
+                } for i in range(total_tasks)]
+
+            # One batched prediction for the whole form, then this user's corrections
+            with metrics.span('predict'):
+                durations = predictor.predict_many(task_inputs)
+                durations = user_models.adjust(current_user.id, task_inputs, durations)
+
+            tasks = [Task(
+                name=task_input['name'],
+                priority=task_input['priority'],
+                category=task_input['category'],
+                duration=duration,
+                urgency=task_input['urgency']
+            ) for task_input, duration in zip(task_inputs, durations)]
+
+            scheduler = DayScheduler(tasks, available_hours, mode=scheduling_mode)
+            with metrics.span('create_schedule'):
+                schedule = scheduler.create_schedule()
             
             save_scheduled_tasks(schedule)
             
@@ -186,79 +314,229 @@ def plan():
 
     return render_template('index.html', current_user=current_user, step=1)
 
+def parse_history_cursor(cursor):
+    """Split a 'date|start_time|id' cursor from the previous page's last row"""
+    date, start_time, task_id = cursor.split('|', 2)
+    return date, start_time, int(task_id)
+
+def parse_date_param(name):
+    value = request.args.get(name, '').strip()
+    if value:
+        datetime.strptime(value, '%Y-%m-%d')  # Validate, keep as text for SQLite
+    return value or None
+
+def history_query(date_from=None, date_to=None, cursor=None):
+    """SQL and parameters for the current user's history, newest day first"""
+    query = '''
+        SELECT id, scheduled_date as date, name, priority, category, 
+               start_time, end_time, duration, actual_duration
+        FROM tasks
+        WHERE user_id = ?
+    '''
+    params = [current_user.id]
+    if date_from:
+        query += ' AND scheduled_date >= ?'
+        params.append(date_from)
+    if date_to:
+        query += ' AND scheduled_date <= ?'
+        params.append(date_to)
+    if cursor:
+        # Keyset pagination: continue after the last row of the previous page
+        # instead of OFFSET. The plain scheduled_date <= ? bound is what lets
+        # SQLite seek into the index; the OR below only trims that first day.
+        last_date, last_start, last_id = parse_history_cursor(cursor)
+        query += '''
+            AND scheduled_date <= ?
+            AND (scheduled_date < ?
+                 OR (scheduled_date = ? AND (start_time > ?
+                     OR (start_time = ? AND id > ?))))
+        '''
+        params += [last_date, last_date, last_date, last_start, last_start, last_id]
+    query += ' ORDER BY scheduled_date DESC, start_time ASC, id ASC'
+    return query, params
+
 @app.route('/history')
 @login_required
 def history():
     try:
-        with closing(sqlite3.connect(DATABASE)) as conn:
-            conn.row_factory = sqlite3.Row
-            tasks = conn.execute('''
-                SELECT scheduled_date as date, name, priority, category, 
-                       start_time, end_time, duration
-                FROM tasks
-                WHERE user_id = ?
-                ORDER BY scheduled_date DESC, start_time ASC
-            ''', (current_user.id,)).fetchall()
+        per_page = request.args.get('per_page', HISTORY_PAGE_SIZE, type=int)
+        per_page = max(1, min(per_page, HISTORY_MAX_PAGE_SIZE))
+        date_from = parse_date_param('from')
+        date_to = parse_date_param('to')
+        cursor = request.args.get('after')
+
+        query, params = history_query(date_from, date_to, cursor)
+        query += ' LIMIT ?'
+        params.append(per_page + 1)  # One extra row tells us if there is a next page
+
+        tasks = get_db().execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(tasks) > per_page:
+            tasks = tasks[:per_page]
+            last = tasks[-1]
+            next_cursor = f"{last['date']}|{last['start_time']}|{last['id']}"
+        
+        return render_template('history.html', 
+                            tasks=tasks,
+                            next_cursor=next_cursor,
+                            per_page=per_page,
+                            date_from=date_from,
+                            date_to=date_to,
+                            current_user=current_user)
             
-            return render_template('history.html', 
-                                tasks=tasks,
-                                current_user=current_user)
-                
     except Exception as e:
         logging.error(f"Error fetching history: {str(e)}")
         return render_template('history.html', 
                             error=str(e),
                             current_user=current_user)
 
-# Helper classes and functions
-class DayScheduler:
-    def __init__(self, tasks, available_hours):
-        self.tasks = sorted(tasks, key=lambda x: x.weight, reverse=True)
-        self.available_minutes = available_hours * 60
-        
-    def create_schedule(self):
-        scheduled = []
-        remaining_time = self.available_minutes
-        current_time = datetime.now().replace(hour=9, minute=0)  # Start at 9 AM
-        
-        for task in self.tasks:
-            if task.duration <= remaining_time:
-                end_time = current_time + timedelta(minutes=task.duration)
-                scheduled.append({
-                    'name': task.name,
-                    'start': current_time.strftime('%H:%M'),
-                    'end': end_time.strftime('%H:%M'),
-                    'duration': f'{int(task.duration)} mins',
-                    'priority': task.priority.capitalize(),
-                    'category': task.category.capitalize()
-                })
-                current_time = end_time
-                remaining_time -= task.duration
-        
-        return {
-            'scheduled_tasks': scheduled,
-            'total_scheduled': len(scheduled),
-            'remaining_time': f'{int(remaining_time // 60)}h {int(remaining_time % 60)}m'
-        }
+@app.route('/tasks/<int:task_id>/complete', methods=['POST'])
+@login_required
+def complete_task(task_id):
+    """Record how many minutes a scheduled task actually took.
+
+    Accepts a form field or JSON body actual_duration. TrainingPipeline
+    trains the duration model on these.
+    """
+    payload = request.get_json(silent=True) if request.is_json else request.form
+    try:
+        actual_duration = round(float((payload or {}).get('actual_duration')))
+        if not 1 <= actual_duration <= 24 * 60:
+            raise ValueError
+    except (TypeError, ValueError, OverflowError, AttributeError):
+        error = 'actual_duration must be a number of minutes between 1 and 1440'
+        if request.is_json:
+            return jsonify(error=error), 400
+        flash(error, 'error')
+        return redirect(request.referrer or url_for('history'))
+
+    with get_db() as conn:
+        updated = conn.execute('''
+            UPDATE tasks
+            SET actual_duration = ?, completed_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE id = ? AND user_id = ?
+        ''', (actual_duration, task_id, current_user.id)).rowcount
+
+    if request.is_json:
+        if not updated:
+            return jsonify(error='Task not found'), 404
+        return jsonify(id=task_id, actual_duration=actual_duration)
+    if updated:
+        flash('Task marked as done', 'success')
+    else:
+        flash('Task not found', 'error')
+    return redirect(request.referrer or url_for('history'))
 
+# JSON API for machine clients
+def parse_api_task(index, item):
+    """Validate one task from an /api/plan payload into a predictor input"""
+    if not isinstance(item, dict):
+        raise ValueError(f"Task {index} must be an object")
+    name = str(item.get('name', '')).strip()
+    if not name:
+        raise ValueError(f"Task {index} needs a name")
+    priority = str(item.get('priority', 'medium')).lower()
+    if priority not in Task.PRIORITY_WEIGHTS:
+        raise ValueError(f"Task {index} has invalid priority: {priority}")
+    try:
+        urgency = float(item.get('urgency', 0.5))
+    except (TypeError, ValueError):
+        urgency = None
+    # Flask's JSON parser accepts NaN and Infinity; both would end up in tasks.urgency
+    if urgency is None or not (math.isfinite(urgency) and 0 <= urgency <= 1):
+        raise ValueError(f"Task {index} urgency must be a number from 0 to 1")
+    return {
+        'name': name,
+        'priority': priority,
+        'category': str(item.get('category', '')).lower(),
+        'urgency': urgency
+    }
+
+@app.route('/api/plan', methods=['POST'])
+@login_required
+def api_plan():
+    """Plan a JSON array of tasks (or {"tasks": [...], "available_hours": 8})"""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list):
+        payload = {'tasks': payload}
+    if not isinstance(payload, dict) or not isinstance(payload.get('tasks'), list):
+        return jsonify(error='Expected a JSON array of tasks or {"tasks": [...]}'), 400
+
+    try:
+        available_hours = float(payload.get('available_hours', 8))
+        task_inputs = [parse_api_task(i, item) for i, item in enumerate(payload['tasks'])]
+        with metrics.span('predict'):
+            durations = predictor.predict_many(task_inputs)
+            durations = user_models.adjust(current_user.id, task_inputs, durations)
+        tasks = [Task(
+            name=task_input['name'],
+            priority=task_input['priority'],
+            category=task_input['category'],
+            duration=duration,
+            urgency=task_input['urgency']
+        ) for task_input, duration in zip(task_inputs, durations)]
+        # Rejects non-finite hours and anything outside (0, 24]
+        scheduler = DayScheduler(tasks, available_hours,
+                                 mode=payload.get('mode', 'greedy'),
+                                 value=payload.get('value', 'weight'))
+        with metrics.span('create_schedule'):
+            schedule = scheduler.create_schedule()
+    except (TypeError, ValueError, OverflowError) as e:
+        return jsonify(error=str(e)), 400
+
+    saved = save_scheduled_tasks(schedule)
+
+    return jsonify(schedule=schedule, available_hours=available_hours, saved=saved)
+
+@app.route('/api/history')
+@login_required
+def api_history():
+    """Stream the user's whole history (optionally from/to filtered) as a JSON array"""
+    try:
+        query, params = history_query(parse_date_param('from'), parse_date_param('to'))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    def generate():
+        rows = get_db().execute(query, params)
+        yield '['
+        separator = ''
+        while True:
+            chunk = rows.fetchmany(HISTORY_STREAM_CHUNK)
+            if not chunk:
+                break
+            yield separator + ','.join(json.dumps(dict(row)) for row in chunk)
+            separator = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# Helper functions
 def save_scheduled_tasks(schedule):
+    with metrics.span('save_scheduled_tasks'):
+        return _save_scheduled_tasks(schedule)
+
+def _save_scheduled_tasks(schedule):
     try:
-        with closing(sqlite3.connect(DATABASE)) as conn:
-            with conn:
-                for task in schedule['scheduled_tasks']:
-                    conn.execute('''
-                        INSERT INTO tasks 
-                        (user_id, name, priority, category, duration, scheduled_date, start_time, end_time)
-                        VALUES (?, ?, ?, ?, ?, date('now'), ?, ?)
-                    ''', (
-                        current_user.id,
-                        task['name'],
-                        task['priority'].lower(),
-                        task['category'].lower(),
-                        int(task['duration'].split()[0]),
-                        task['start'],
-                        task['end']
-                    ))
+        rows = [(
+            current_user.id,
+            task['name'],
+            task['priority'].lower(),
+            task['category'].lower(),
+            int(task['duration'].split()[0]),
+            task['start'],
+            task['end'],
+            task.get('urgency', 0.5)
+        ) for task in schedule['scheduled_tasks']]
+
+        # One statement, one transaction, one commit
+        with get_db() as conn:
+            conn.executemany('''
+                INSERT INTO tasks 
+                (user_id, name, priority, category, duration, scheduled_date, start_time, end_time, urgency)
+                VALUES (?, ?, ?, ?, ?, date('now'), ?, ?, ?)
+            ''', rows)
         return True
     except Exception as e:
         logging.error(f'Error saving tasks: {str(e)}')
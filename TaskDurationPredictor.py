@@ -2,16 +2,220 @@ from datetime import datetime, timedelta
 import pandas as pd
 import joblib
 from task import Task
+from DataTaskManager import TaskDataManager
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 import numpy as np
+import copy
+import csv
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+URGENCY_FEATURE = 2  # Column of urgency in the [priority, category, urgency] rows
+
+# What TaskDurationPredictor.clean_data does. Cached cleaned data is keyed on
+# these, so bump 'version' whenever clean_data changes in a way they don't show.
+CLEANING_RULES = {
+    'version': 1,
+    'string_cols': ['priority', 'category'],
+    'numeric_cols': ['urgency', 'duration'],
+    'numeric_defaults': {'urgency': 0.5, 'duration': None},  # None = column median
+    'required_cols': ['priority', 'category', 'urgency', 'duration'],
+    'valid_priorities': ['low', 'medium', 'high'],
+    'default_priority': 'medium',
+}
+
+
+def cleaning_fingerprint():
+    return hashlib.sha256(json.dumps(CLEANING_RULES, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# Forest settings tried by TaskDurationPredictor.train_search()
+SEARCH_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [5, 10, None],
+    'min_samples_leaf': [1, 5, 10]
+}
+
+# Per-process copy of the search data, set once by _init_search_worker
+_search_data = None
+
+
+def _init_search_worker(X, y, splits):
+    global _search_data
+    _search_data = (X, y, splits)
+
+
+def _score_fold(job):
+    """Fit one configuration on one training fold and return its validation MAE"""
+    params, fold = job
+    X, y, splits = _search_data
+    train_index, test_index = splits[fold]
+    model = RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    model.fit(X[train_index], y[train_index])
+    return mean_absolute_error(y[test_index], model.predict(X[test_index]))
+
+
+class CompiledDurationTable:
+    """Forest predictions precomputed for every priority x category x urgency cell.
+
+    With urgency_resolution=None the urgency axis is cut at the forest's own
+    split thresholds, so every cell is a region where all trees take the same
+    path and the table reproduces the forest exactly. With an integer
+    resolution the axis is an evenly spaced grid and the table is an
+    approximation; use check() to measure how close it is.
+    """
+
+    def __init__(self, model, priority_map, category_mapping, urgency_resolution=None):
+        priority_codes = sorted(set(priority_map.values()) | {2})  # 2 = default medium
+        category_codes = sorted(set(category_mapping.values()) | {-1})  # -1 = unknown
+        self.priority_index = {code: i for i, code in enumerate(priority_codes)}
+        self.category_index = {code: i for i, code in enumerate(category_codes)}
+        self.priority_codes = np.array(priority_codes, dtype=float)  # sorted, for lookup_many
+        self.category_codes = np.array(category_codes, dtype=float)
+        self.urgency_resolution = urgency_resolution
+
+        if urgency_resolution is None:
+            self.urgency_cuts = self.urgency_thresholds(model)
+            urgency_points = self._interval_representatives(self.urgency_cuts)
+        else:
+            if urgency_resolution < 2:
+                raise ValueError("urgency_resolution must be at least 2")
+            self.urgency_cuts = None
+            urgency_points = np.linspace(0, 1, urgency_resolution)
+
+        # One forest pass over the whole grid
+        grid = np.array(np.meshgrid(priority_codes, category_codes, urgency_points,
+                                    indexing='ij'), dtype=float).reshape(3, -1).T
+        predictions = np.clip(model.predict(grid), 1, 240)  # 1min to 4hrs
+        self.table = predictions.reshape(len(priority_codes), len(category_codes),
+                                         len(urgency_points))
+
+    @staticmethod
+    def urgency_thresholds(model):
+        """Sorted split thresholds on urgency that fall inside the clamped [0, 1) range"""
+        cuts = set()
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            cuts.update(tree.threshold[tree.feature == URGENCY_FEATURE].tolist())
+        return [cut for cut in sorted(cuts) if 0 <= cut < 1]
+
+    @staticmethod
+    def _interval_representatives(cuts):
+        """One urgency value inside each (cut[i-1], cut[i]] interval, plus 1.0 for the last one.
+
+        Trees compare float32 copies of the features, so the representative is
+        the largest float32 that is still <= the cut.
+        """
+        points = []
+        previous = -np.inf
+        for cut in cuts:
+            point = np.float32(cut)
+            if float(point) > cut:
+                point = np.nextafter(point, np.float32(-np.inf))
+            point = float(point)
+            if point <= previous:
+                point = (previous + cut) / 2
+            points.append(point)
+            previous = cut
+        points.append(1.0)
+        return points
+
+    def urgency_index(self, urgency):
+        if self.urgency_cuts is None:
+            return int(round(urgency * (self.urgency_resolution - 1)))
+        return bisect_left(self.urgency_cuts, float(np.float32(urgency)))
+
+    def lookup(self, features):
+        """Prediction for one encoded [priority, category, urgency] row"""
+        priority, category, urgency = features
+        return float(self.table[self.priority_index[priority],
+                                self.category_index[category],
+                                self.urgency_index(urgency)])
+
+    def lookup_many(self, rows):
+        """Predictions for an (n, 3) array of encoded rows, without a Python loop"""
+        rows = np.asarray(rows, dtype=float).reshape(-1, 3)
+        priority_idx = self._code_index(self.priority_codes, rows[:, 0], 'priority')
+        category_idx = self._code_index(self.category_codes, rows[:, 1], 'category')
+        urgency = np.clip(rows[:, URGENCY_FEATURE], 0, 1)
+        if self.urgency_cuts is None:
+            urgency_idx = np.rint(urgency * (self.urgency_resolution - 1)).astype(np.intp)
+        else:
+            # Same float32 rounding and bisect_left semantics as urgency_index
+            urgency_idx = np.searchsorted(np.asarray(self.urgency_cuts, dtype=float),
+                                          urgency.astype(np.float32).astype(float), side='left')
+        return self.table[priority_idx, category_idx, urgency_idx]
+
+    @staticmethod
+    def _code_index(codes, values, name):
+        index = np.searchsorted(codes, values)
+        found = (index < len(codes)) & (codes[np.minimum(index, len(codes) - 1)] == values)
+        if not found.all():
+            raise KeyError(f"Unknown {name} code: {values[~found][0]}")
+        return index
+
+    def check(self, model, n_samples=2000, random_state=0):
+        """Compare table lookups with real forest predictions.
+
+        Probes every priority/category pair at random urgencies and just either
+        side of each urgency cut. Returns the number of probes and the largest
+        absolute difference in minutes.
+        """
+        rng = np.random.default_rng(random_state)
+        urgencies = list(rng.uniform(0, 1, n_samples)) + [0.0, 1.0]
+        for cut in self.urgency_cuts or []:
+            urgencies.extend(
+                u for u in (cut, np.nextafter(cut, -np.inf), np.nextafter(cut, np.inf)) if 0 <= u <= 1
+            )
+
+        rows = [[priority, category, urgency]
+                for priority in self.priority_index
+                for category in self.category_index
+                for urgency in urgencies]
+        expected = np.clip(model.predict(np.array(rows, dtype=float)), 1, 240)
+        actual = self.lookup_many(rows)
+
+        return {
+            'checked': len(rows),
+            'max_abs_error': float(np.max(np.abs(actual - expected))),
+            'cells': int(self.table.size)
+        }
+
+
+# Everything a prediction reads, swapped in as one object on (re)load
+LoadedModel = namedtuple('LoadedModel', ['model', 'priority_map', 'category_mapping', 'compiled_table'])
+
 
 class TaskDurationPredictor:    
-    def __init__(self, model_filename="task_model.pkl"):
+    def __init__(self, model_filename="task_model.pkl", mmap_mode=None, cache_data=True):
         self.model_filename = model_filename
+        self.mmap_mode = mmap_mode  # Passed to joblib.load; sklearn trees still load as in-memory copies
+        self.cache_data = cache_data  # Reuse cleaned data between load_data calls (see load_data)
+        self._data_cache = {}  # abspath -> (source stamp, cleaned DataFrame)
+        self.training_metrics = None  # Cross-validation metrics saved by train_search()
+        self.ready = False  # True once a trained model is in memory
         self.model = RandomForestRegressor()
+        self.compiled_table = None  # Set by enable_compiled()
+        self.compile_settings = None
+        self.active = None  # LoadedModel snapshot used by predictions
+        self.model_version = None  # (mtime, size) of the model file last loaded or saved
+        self._load_lock = threading.Lock()
+        self._watcher_stop = None
+        self._watcher_pid = None
         self.priority_map = {'low': 1, 'medium': 2, 'high': 3}
         self.category_mapping = {
             'hobby': 0,
@@ -22,192 +226,620 @@ class TaskDurationPredictor:
         }
 
     def load_data(self, csv_filename="tasks.csv"):
-        """Load and clean data"""
-        df = pd.read_csv(csv_filename)
-        
+        """Load and clean data.
+
+        The cleaned result is cached in memory and in a columnar copy next to
+        the CSV (tasks.csv -> tasks.columns/), keyed by the file's size,
+        mtime and SHA-256 and by CLEANING_RULES. Loading an unchanged file
+        again skips parsing and cleaning; a file that was only touched is
+        recognised by its hash.
+        """
+        if not self.cache_data:
+            return self.clean_data(pd.read_csv(csv_filename))
+
+        key = os.path.abspath(csv_filename)
+        manager = TaskDataManager(csv_filename)
+        stamp = manager.source_stamp(csv_filename)
+        cached = self._data_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1].copy(deep=False)  # Callers add columns, never write values
+
+        directory = manager.columnar_dir(csv_filename)
+        meta = manager.columnar_meta(directory)
+        extra = meta.get("extra") if meta else None
+        data = None
+        df = None
+        if extra and extra.get("rules") == cleaning_fingerprint():
+            if meta.get("source") != stamp:
+                with open(csv_filename, mode='rb') as file:
+                    data = file.read()
+                if hashlib.sha256(data).hexdigest() == extra.get("sha256"):
+                    stamp = manager.touch_columnar(directory, csv_filename)["source"]
+                    data = None
+            if data is None:
+                df = manager.load_columnar(directory)
+                logger.debug("Loaded %d cleaned rows from %s", len(df), directory)
+        if df is None:
+            df = self._clean_and_store(manager, csv_filename, data)
+            stamp = manager.source_stamp(csv_filename)
+
+        self._data_cache[key] = (stamp, df)
+        return df.copy(deep=False)
+
+    def _clean_and_store(self, manager, csv_filename, data=None):
+        """Parse and clean a CSV, then write the columnar cache for it"""
+        if data is None:
+            with open(csv_filename, mode='rb') as file:
+                data = file.read()
+        df = self.clean_data(pd.read_csv(io.BytesIO(data)))
+        extra = {"rules": cleaning_fingerprint(), "sha256": hashlib.sha256(data).hexdigest()}
+        try:
+            manager.save_columnar(df, manager.columnar_dir(csv_filename), csv_filename, extra)
+        except OSError as e:
+            logger.warning("Could not write cleaned data cache for %s: %s", csv_filename, e)
+        return df
+
+    def convert_to_columnar(self, csv_filename="tasks.csv"):
+        """Clean a CSV now and store the result next to it for load_data"""
+        return self._clean_and_store(TaskDataManager(csv_filename), csv_filename)
+
+    @staticmethod
+    def clean_data(df):
+        """Normalise and validate a raw task DataFrame according to CLEANING_RULES"""
         # ===== DATA CLEANING =====
         # 1. Convert all strings to lowercase and strip whitespace
-        string_cols = ['priority', 'category']
-        for col in string_cols:
+        for col in CLEANING_RULES['string_cols']:
             if col in df.columns:
                 df[col] = df[col].astype(str).str.lower().str.strip()
         
         # 2. Clean numeric columns
-        numeric_cols = ['urgency', 'duration']
-        for col in numeric_cols:
+        for col in CLEANING_RULES['numeric_cols']:
             if col in df.columns:
                 # Convert to numeric, coercing errors to NaN
                 df[col] = pd.to_numeric(df[col], errors='coerce')
                 # Fill NaN with defaults (urgency: 0.5, duration: median)
-                default = 0.5 if col == 'urgency' else df[col].median()
+                default = CLEANING_RULES['numeric_defaults'].get(col)
+                if default is None:
+                    default = df[col].median()
                 df[col] = df[col].fillna(default)
         
         # 3. Validate required columns
-        required_cols = ['priority', 'category', 'urgency', 'duration']
+        required_cols = CLEANING_RULES['required_cols']
         if not all(col in df.columns for col in required_cols):
             missing = [col for col in required_cols if col not in df.columns]
             raise ValueError(f"Missing required columns: {missing}")
         
         # 4. Validate priority values
-        valid_priorities = ['low', 'medium', 'high']
+        valid_priorities = CLEANING_RULES['valid_priorities']
         invalid_pri = df[~df['priority'].isin(valid_priorities)]
         if not invalid_pri.empty:
-            print(f"Warning: Found invalid priorities: {invalid_pri['priority'].unique()}")
+            logger.warning("Found invalid priorities: %s", invalid_pri['priority'].unique())
             df['priority'] = df['priority'].replace(
                 [x for x in invalid_pri['priority'].unique() if x not in valid_priorities],
-                'medium'  # Default to medium
+                CLEANING_RULES['default_priority']
             )
         
         return df
 
-    def train(self, csv_filename="tasks.csv"):
-        """Enhanced training with better validation"""
+    def train(self, csv_filename="tasks.csv", data=None):
+        """Enhanced training with better validation.
+
+        data is an already cleaned DataFrame to train on instead of csv_filename.
+        """
         try:
-            df = self.load_data(csv_filename)
+            df = self.load_data(csv_filename) if data is None else data
             
             # 1. Verify we have enough data
             if len(df) < 10:
                 raise ValueError(f"Only {len(df)} samples - need at least 10 for meaningful training")
             
             # 2. Enhanced feature engineering
-            df['priority'] = df['priority'].str.lower().map(self.priority_map).fillna(2)
-            df['category'] = df['category'].str.lower().map(self.category_mapping).fillna(-1)
-            df['urgency'] = pd.to_numeric(df['urgency'], errors='coerce').fillna(0.5)
+            X, y = self._encode_frame(df)
             
             # 3. Verify feature ranges
-            print("\n==== Feature Verification ====")
-            print("Priority values:", df['priority'].unique())
-            print("Category values:", df['category'].unique())
-            print("Urgency range:", df['urgency'].min(), "to", df['urgency'].max())
-            print("Duration range:", df['duration'].min(), "to", df['duration'].max())
+            logger.info("Feature verification: priority values %s, category values %s, "
+                        "urgency %s to %s, duration %s to %s",
+                        X['priority'].unique(), X['category'].unique(),
+                        X['urgency'].min(), X['urgency'].max(),
+                        y.min(), y.max())
             
             # 4. Train with more trees and depth
-            self.model = RandomForestRegressor(
+            model = RandomForestRegressor(
                 n_estimators=100,  # Increased from default 10
                 max_depth=5,       # Prevent overfitting
                 random_state=42
             )
             
-            X = df[["priority", "category", "urgency"]]
-            y = df["duration"]
-            
-            self.model.fit(X, y)
+            model.fit(X, y)
             
             # 5. Feature importance check
-            print("\n==== Feature Importance ====")
-            for name, importance in zip(X.columns, self.model.feature_importances_):
-                print(f"{name}: {importance:.2f}")
+            for name, importance in zip(X.columns, model.feature_importances_):
+                logger.info("Feature importance %s: %.2f", name, importance)
             
             # Save model
-            joblib.dump({
-                'model': self.model,
-                'category_mapping': self.category_mapping,
-                'priority_map': self.priority_map
-            }, self.model_filename)
+            self._save_model(model)
+            self._install(model, self.priority_map, self.category_mapping)
+            self.training_metrics = None
             
-            print("\n\033[92mTraining successful!\033[0m")
+            logger.info("Training successful")
             return True
             
         except Exception as e:
-            print(f"\n\033[91mTraining failed: {str(e)}\033[0m")
+            logger.error("Training failed: %s", e)
             return False
-        
+
+    def _encode_frame(self, df):
+        """Feature matrix [priority, category, urgency] and duration target of a cleaned DataFrame"""
+        X = pd.DataFrame({
+            'priority': df['priority'].str.lower().map(self.priority_map).fillna(2),
+            'category': df['category'].str.lower().map(self.category_mapping).fillna(-1),
+            'urgency': pd.to_numeric(df['urgency'], errors='coerce').fillna(0.5)
+        })
+        return X, df['duration']
+
+    def train_search(self, csv_filename="tasks.csv", grid=None, folds=5, max_workers=None):
+        """Pick forest settings by k-fold cross-validation, then train and save the best.
+
+        Every (configuration, fold) fit runs as its own job in a process pool,
+        max_workers processes (default: one per core). The mean absolute
+        error of each configuration is logged and returned; the winner is
+        refit on all rows and saved with its metrics.
+        """
+        grid = grid or SEARCH_GRID
+        df = self.load_data(csv_filename)
+        if len(df) < folds * 2:
+            raise ValueError(f"Only {len(df)} samples - need at least {folds * 2} for {folds}-fold search")
+        X, y = self._encode_frame(df)
+        X, y = X.to_numpy(dtype=float), y.to_numpy(dtype=float)
+
+        names = sorted(grid)
+        configs = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+        splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+        jobs = [(c, f) for c in range(len(configs)) for f in range(folds)]
+
+        started = time.perf_counter()
+        fold_errors = np.zeros((len(configs), folds))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_search_worker,
+                                 initargs=(X, y, splits)) as pool:
+            for (c, f), mae in zip(jobs, pool.map(_score_fold, [(configs[c], f) for c, f in jobs])):
+                fold_errors[c, f] = mae
+
+        results = []
+        for config, errors in zip(configs, fold_errors):
+            results.append({'params': config, 'mae': float(errors.mean()), 'mae_std': float(errors.std())})
+            logger.info("CV %s: MAE %.2f (+/- %.2f) minutes", config, errors.mean(), errors.std())
+        results.sort(key=lambda result: result['mae'])
+        best = results[0]
+
+        model = RandomForestRegressor(random_state=42, n_jobs=-1, **best['params'])
+        model.fit(X, y)
+        model.set_params(n_jobs=None)  # Predictions are small batches; skip the thread pool
+        metrics = {
+            'cv_mae': best['mae'],
+            'cv_mae_std': best['mae_std'],
+            'folds': folds,
+            'samples': len(y),
+            'params': best['params'],
+            'search_seconds': round(time.perf_counter() - started, 2)
+        }
+        self._save_model(model, metrics)
+        self._install(model, self.priority_map, self.category_mapping)
+        self.training_metrics = metrics
+        logger.info("Best configuration %s: MAE %.2f minutes (%d configurations, %.1fs)",
+                    best['params'], best['mae'], len(configs), metrics['search_seconds'])
+        return {'best': best, 'results': results, 'metrics': metrics}
+
+    def _save_model(self, model, metrics=None):
+        """Write the model file atomically.
+
+        Dumping to a temporary file and renaming it means a process watching
+        the file (or memory-mapping the old one) never reads a partial model.
+        """
+        tmp_filename = f"{self.model_filename}.tmp"
+        joblib.dump({
+            'model': model,
+            'category_mapping': self.category_mapping,
+            'priority_map': self.priority_map,
+            'metrics': metrics
+        }, tmp_filename)
+        os.replace(tmp_filename, self.model_filename)
+        self.model_version = self._model_file_version()
+
+    def load_model(self):
+        """Load the saved model now instead of on the first prediction.
+
+        Call this at application startup, before worker processes are forked,
+        so every worker starts with the model already in memory.
+        """
+        with self._load_lock:
+            version = self._model_file_version()
+            saved = joblib.load(self.model_filename, mmap_mode=self.mmap_mode)
+            self._install(saved['model'], saved['priority_map'], saved['category_mapping'])
+            self.training_metrics = saved.get('metrics')
+            self.model_version = version
+
+    def _load_model_if_needed(self):
+        """Load the saved model on first use and return the active snapshot"""
+        if self.active is None:
+            self.load_model()
+        return self.active
+
+    def _install(self, model, priority_map, category_mapping):
+        """Make a fully loaded model the one predictions use.
+
+        Everything a prediction needs is bundled into one LoadedModel and
+        published with a single assignment, so a prediction running during a
+        reload sees either the old model or the new one, never a mix.
+        """
+        table, report = self._build_table(model, priority_map, category_mapping)
+        self.model = model
+        self.priority_map = priority_map
+        self.category_mapping = category_mapping
+        self.compiled_table = table
+        self.active = LoadedModel(model, priority_map, category_mapping, table)
+        self.ready = True
+        return report
+
+    def _model_file_version(self):
+        """(mtime, size) of the model file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.model_filename)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self):
+        """Load the model file again if it changed since it was last loaded or saved.
+
+        The new model is loaded and compiled on the side and only then
+        swapped in; if loading fails the current model stays active.
+        """
+        version = self._model_file_version()
+        if version is None or version == self.model_version:
+            return False
+        try:
+            self.load_model()
+            logger.info("Reloaded model from %s", self.model_filename)
+            return True
+        except Exception as e:
+            logger.error("Model reload failed: %s", e)
+            return False
+
+    def start_reload_watcher(self, interval=30.0):
+        """Poll the model file in a daemon thread and hot-swap it when it changes"""
+        self._watcher_stop = threading.Event()
+        self._watcher_pid = os.getpid()
+
+        def watch(stop):
+            while not stop.wait(interval):
+                self.reload_if_changed()
+
+        thread = threading.Thread(target=watch, args=(self._watcher_stop,),
+                                  name="model-reload-watcher", daemon=True)
+        thread.start()
+
+    def ensure_reload_watcher(self, interval=30.0):
+        """Start the watcher unless this process already runs one.
+
+        Threads do not survive fork, so a watcher started in a preloading
+        parent process is restarted in each worker on its first request.
+        """
+        if self._watcher_pid != os.getpid():
+            self.start_reload_watcher(interval)
+
+    def stop_reload_watcher(self):
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+        self._watcher_pid = None
+
+    def enable_compiled(self, urgency_resolution=None, tolerance=0.0):
+        """Answer predictions from a CompiledDurationTable instead of walking the forest.
+
+        The table is rebuilt after every train() or model load. It is only
+        switched on if check() finds no difference larger than tolerance
+        (in minutes); the check report is returned either way.
+        """
+        active = self._load_model_if_needed()
+        self.compile_settings = {'urgency_resolution': urgency_resolution, 'tolerance': tolerance}
+        return self._install(active.model, active.priority_map, active.category_mapping)
+
+    def disable_compiled(self):
+        self.compile_settings = None
+        if self.active is not None:
+            self._install(self.active.model, self.active.priority_map, self.active.category_mapping)
+
+    def _build_table(self, model, priority_map, category_mapping):
+        """Lookup table and check report for a model, if compiled mode is on"""
+        if self.compile_settings is None:
+            return None, None
+
+        table = CompiledDurationTable(model, priority_map, category_mapping,
+                                      self.compile_settings['urgency_resolution'])
+        report = table.check(model)
+        report['enabled'] = report['max_abs_error'] <= self.compile_settings['tolerance']
+        if not report['enabled']:
+            logger.warning("Compiled table disabled: max error %.3f exceeds tolerance %s",
+                           report['max_abs_error'], self.compile_settings['tolerance'])
+            table = None
+        return table, report
+
+    @staticmethod
+    def _predict_rows(active, rows):
+        """Clamped predictions for encoded feature rows"""
+        if active.compiled_table is not None:
+            return active.compiled_table.lookup_many(rows)
+        return np.clip(active.model.predict(np.array(rows, dtype=float)), 1, 240)  # 1min to 4hrs
+
+    @staticmethod
+    def _encode_task(active, task):
+        """Turn a task dict into the [priority, category, urgency] feature row"""
+        priority = str(task.get('priority', 'medium')).lower()
+        category = str(task.get('category', '')).lower()
+        urgency = float(task.get('urgency', 0.5))
+
+        return [
+            active.priority_map.get(priority, 2),  # default medium
+            active.category_mapping.get(category, -1),  # unknown
+            max(0, min(1, urgency))  # clamp to 0-1 range
+        ]
 
     def predict_duration(self, task):
-        """Enhanced prediction with debugging"""
+        """Enhanced prediction with debugging.
+
+        Input, features, prediction and timing are logged at DEBUG; when
+        DEBUG is off nothing is formatted or timed.
+        """
+        debug = logger.isEnabledFor(logging.DEBUG)
+        started = time.perf_counter() if debug else None
         try:
-            # Debug input
-            print("\n==== Prediction Input ====")
-            print("Raw input:", task)
-            
             # Load model if needed
-            if not hasattr(self.model, 'estimators_'):
-                saved = joblib.load(self.model_filename)
-                self.model = saved['model']
-                self.category_mapping = saved['category_mapping']
-                self.priority_map = saved['priority_map']
+            active = self._load_model_if_needed()
             
             # Prepare features with validation
-            priority = str(task.get('priority', 'medium')).lower()
-            category = str(task.get('category', '')).lower()
-            urgency = float(task.get('urgency', 0.5))
-            
-            features = [
-                self.priority_map.get(priority, 2),  # default medium
-                self.category_mapping.get(category, -1),  # unknown
-                max(0, min(1, urgency))  # clamp to 0-1 range
-            ]
-            
-            print("Processed features:", features)
+            features = self._encode_task(active, task)
             
             # Predict and ensure reasonable output
-            prediction = max(1, min(240, self.model.predict([features])[0]))  # 1min to 4hrs
-            print("Raw prediction:", prediction)
+            if active.compiled_table is not None:
+                prediction = active.compiled_table.lookup(features)
+            else:
+                prediction = max(1, min(240, active.model.predict([features])[0]))  # 1min to 4hrs
+
+            if debug:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                logger.debug("Prediction input=%s features=%s prediction=%.1f elapsed_ms=%.3f",
+                             task, features, prediction, elapsed_ms,
+                             extra={'elapsed_ms': elapsed_ms})
             
             return prediction
             
         except Exception as e:
-            print(f"\n\033[91mPrediction error: {str(e)}\033[0m")
+            logger.error("Prediction error: %s", e)
             return 30  # Fallback value
+
+    def predict_many(self, tasks):
+        """Predict durations for a list of tasks with a single model.predict call.
+
+        Each task gets the same treatment as predict_duration: features are
+        clamped, predictions are limited to 1min-4hrs and a task that cannot
+        be encoded falls back to 30 minutes without affecting the others.
+        """
+        predictions = [30] * len(tasks)  # Fallback values
+        if not tasks:
+            return predictions
+
+        debug = logger.isEnabledFor(logging.DEBUG)
+        started = time.perf_counter() if debug else None
+        try:
+            active = self._load_model_if_needed()
+        except Exception as e:
+            logger.error("Prediction error: %s", e)
+            return predictions
+
+        rows = []
+        row_indexes = []
+        for i, task in enumerate(tasks):
+            try:
+                rows.append(self._encode_task(active, task))
+                row_indexes.append(i)
+            except Exception as e:
+                logger.error("Prediction error for task %d: %s", i, e)
+
+        if rows:
+            try:
+                for i, prediction in zip(row_indexes, self._predict_rows(active, rows)):
+                    predictions[i] = float(prediction)
+            except Exception as e:
+                logger.error("Prediction error: %s", e)
+
+        if debug:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.debug("Batch prediction tasks=%d encoded=%d elapsed_ms=%.3f",
+                         len(tasks), len(rows), elapsed_ms, extra={'elapsed_ms': elapsed_ms})
+
+        return predictions
         
-    # Add this method to automatically update your model
-    def update_model(self, new_data_file):
-        """Incremental model update"""
+    def update_model(self, new_data_file, training_file="tasks.csv", new_trees=10, max_trees=None):
+        """Incremental model update.
+
+        Grows the current forest with warm_start by new_trees trees fitted
+        on the rows of new_data_file only, and retires the oldest trees so
+        the forest stays at max_trees (default: its current size). The cost
+        depends on the new rows, not the whole history. With no trained
+        forest yet this falls back to a full train() on training_file plus
+        the new rows. The new rows are appended to training_file only once
+        the model has been updated.
+        """
         try:
-            new_data = self.load_data(new_data_file)
-            self.validate_data(new_data)
-            
-            # Retrain with combined data
-            combined = pd.concat([self.load_data(), new_data])
-            self.train(combined)
-            
-            print("Model updated successfully")
+            raw = pd.read_csv(new_data_file)
+            new_data = self.clean_data(raw.copy())
+            if len(new_data) < 10:
+                raise ValueError(f"Only {len(new_data)} new samples - need at least 10 to grow the forest")
+
+            if not self.has_forest():
+                logger.info("No trained forest to update, training from %s", training_file)
+                data = new_data
+                if os.path.exists(training_file):
+                    data = pd.concat([self.load_data(training_file), new_data], ignore_index=True)
+                if not self.train(data=data):
+                    return False
+            else:
+                self.grow_forest(new_data, new_trees, max_trees)
+
+            self._append_training_rows(raw, training_file)
+            return True
         except Exception as e:
-            print(f"Update failed: {str(e)}")
+            logger.error("Update failed: %s", e)
+            return False
+
+    def has_forest(self):
+        """True if a fitted forest is loaded or can be loaded from the model file"""
+        if self.active is None and os.path.exists(self.model_filename):
+            self._load_model_if_needed()
+        return self.active is not None and hasattr(self.active.model, 'estimators_')
+
+    def grow_forest(self, new_data, new_trees=10, max_trees=None):
+        """Add new_trees trees fitted on a cleaned DataFrame to the active forest
+        with warm_start and retire the oldest beyond max_trees (default: the
+        current size), then save and install the result."""
+        active = self._load_model_if_needed()
 
-    def print_predictions(self, csv_filename="tasks.csv"):
-        """Print actual vs predicted durations in terminal"""
+        # Work on a shallow copy so predictions keep using the current model until _install
+        current = active.model
+        model = copy.copy(current)
+        model.estimators_ = list(current.estimators_)
+        max_trees = max_trees or len(current.estimators_)
+        if not 0 < new_trees < max_trees:
+            raise ValueError(f"new_trees must be at least 1 and below max_trees ({max_trees}), "
+                             f"got {new_trees}; otherwise every existing tree is retired")
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+
+        X, y = self._encode_frame(new_data)
+        model.fit(X, y)
+
+        retired = max(0, len(model.estimators_) - max_trees)
+        model.estimators_ = model.estimators_[retired:]  # Oldest trees come first
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+
+        metrics = dict(self.training_metrics or {})
+        metrics['last_update'] = {
+            'rows': len(new_data),
+            'trees_added': new_trees,
+            'trees_retired': retired,
+            'updated_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self._save_model(model, metrics)
+        self._install(model, active.priority_map, active.category_mapping)
+        self.training_metrics = metrics
+
+        logger.info("Model updated successfully: %d rows, %d trees added, %d retired",
+                    len(new_data), new_trees, retired)
+        return metrics['last_update']
+
+    @staticmethod
+    def _append_training_rows(raw, training_file):
+        """Append raw rows to the training CSV in its column order"""
+        if not os.path.exists(training_file):
+            raw.to_csv(training_file, index=False)
+            return
+        with open(training_file, mode='r', newline='') as file:
+            header = next(csv.reader(file), None)
+        with open(training_file, mode='rb') as file:
+            needs_newline = False
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+                needs_newline = file.read(1) != b"\n"
+        with open(training_file, mode='a', newline='') as file:
+            if needs_newline:
+                file.write("\n")
+            raw.reindex(columns=header).to_csv(file, header=False, index=False)
+
+    def evaluate(self, csv_filename="tasks.csv", data=None, summary_file=None):
+        """Compare the active model's predictions with actual durations.
+
+        Everything is computed on whole columns. Returns a dict with
+        overall errors (MAE, median, RMSE, percentiles, share of errors over
+        an hour), per-category and per-priority MAE, and a 'rows' DataFrame
+        of actual vs predicted per task. summary_file, if given, gets the
+        per-group table (.csv) or the whole result except the rows (.json).
+        """
+        active = self._load_model_if_needed()
+        df = self.load_data(csv_filename) if data is None else data
+        if df.empty:
+            raise ValueError("No rows to evaluate")
+
+        X, y = self._encode_frame(df)
+        actual = y.to_numpy(dtype=float)
+        predicted = self._predict_rows(active, X.to_numpy(dtype=float))
+        errors = predicted - actual
+        abs_errors = np.abs(errors)
+
+        rows = pd.DataFrame({
+            'name': df['name'].to_numpy() if 'name' in df.columns else np.arange(1, len(df) + 1),
+            'priority': df['priority'].to_numpy(),
+            'category': df['category'].to_numpy(),
+            'actual': actual,
+            'predicted': predicted,
+            'error': errors,
+            'abs_error': abs_errors
+        })
+
+        def by_group(column):
+            groups = rows.groupby(column, sort=True)['abs_error'].agg(['count', 'mean'])
+            return {str(name): {'count': int(row['count']), 'mae': float(row['mean'])}
+                    for name, row in groups.iterrows()}
+
+        percentiles = (50, 75, 90, 95, 99)
+        result = {
+            'samples': len(rows),
+            'mae': float(abs_errors.mean()),
+            'median_ae': float(np.median(abs_errors)),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'bias': float(errors.mean()),  # > 0 means the model overestimates
+            'percentiles': dict(zip(percentiles, np.percentile(abs_errors, percentiles).tolist())),
+            'critical_rate': float((abs_errors > 60).mean()),  # Off by more than an hour
+            'by_category': by_group('category'),
+            'by_priority': by_group('priority'),
+            'rows': rows
+        }
+
+        if summary_file:
+            if summary_file.endswith('.json'):
+                with open(summary_file, 'w') as file:
+                    json.dump({key: value for key, value in result.items() if key != 'rows'},
+                              file, indent=4)
+            else:
+                table = [{'group': group, 'value': name, **stats}
+                         for group in ('category', 'priority')
+                         for name, stats in result[f'by_{group}'].items()]
+                table.append({'group': 'all', 'value': 'all', 'count': result['samples'], 'mae': result['mae']})
+                pd.DataFrame(table).to_csv(summary_file, index=False)
+
+        return result
+
+    def print_predictions(self, csv_filename="tasks.csv", limit=20):
+        """Log actual vs predicted durations for the first limit tasks and the evaluate() summary at INFO"""
         try:
-            df = self.load_data(csv_filename)
-            
-            # Prepare features
-            df['priority'] = df['priority'].map(self.priority_map)
-            df['category'] = df['category'].map(self.category_mapping)
-            X = df[["priority", "category", "urgency"]]
-            y_true = df["duration"]
-            
-            # Make predictions
-            y_pred = self.model.predict(X)
-            
-            # Print header
-            print("\n" + "="*70)
-            print(f"{'Task Name':<20} | {'Actual':>7} | {'Predicted':>9} | {'Difference':>10}")
-            print("-"*70)
-            
-            # Print each prediction
-            for i, (true, pred) in enumerate(zip(y_true, y_pred)):
-                task_name = df.iloc[i].get('name', f'Task {i+1}')[:18] + ("..." if len(df.iloc[i].get('name', '')) > 18 else "")
-                diff = pred - true
-                diff_str = f"{diff:+.1f}"
-                
-                # Color coding
-                if abs(diff) < 5:
-                    diff_str = f"\033[92m{diff_str}\033[0m"  # Green
-                elif abs(diff) < 15:
-                    diff_str = f"\033[93m{diff_str}\033[0m"  # Yellow
-                else:
-                    diff_str = f"\033[91m{diff_str}\033[0m"  # Red
-                    
-                print(f"{task_name:<20} | {true:>7.1f} | {pred:>9.1f} | {diff_str:>10}")
-            
-            # Print summary stats
-            mae = (y_pred - y_true).abs().mean()
-            print("="*70)
-            print(f"Mean Absolute Error: \033[1m{mae:.2f} minutes\033[0m")
-            print("="*70 + "\n")
+            result = self.evaluate(csv_filename)
+
+            sample = result['rows'].head(limit)
+            if limit:
+                logger.info("Predictions (first %d of %d):\n%s", len(sample), result['samples'],
+                            sample[['name', 'actual', 'predicted', 'error']].to_string(
+                                index=False, float_format=lambda value: f"{value:.1f}"))
+
+            logger.info("Mean Absolute Error: %.2f minutes (median %.2f, RMSE %.2f)",
+                        result['mae'], result['median_ae'], result['rmse'])
+            logger.info("Error percentiles: %s", ", ".join(
+                f"p{p} {value:.1f}" for p, value in result['percentiles'].items()))
+            logger.info("Errors over 60 minutes: %.1f%%", result['critical_rate'] * 100)
+            for group in ('category', 'priority'):
+                logger.info("MAE by %s: %s", group, ", ".join(
+                    f"{name} {stats['mae']:.1f} (n={stats['count']})"
+                    for name, stats in result[f'by_{group}'].items()))
+            return result
             
         except Exception as e:
-            print(f"\n\033[91mError displaying predictions: {str(e)}\033[0m\n")
+            logger.error("Error displaying predictions: %s", e)
 
 # from datetime import datetime, timedelta
 # import pandas as pd
@@ -0,0 +1,185 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from TaskDurationPredictor import TaskDurationPredictor
+from UserModels import UserModelStore
+
+logger = logging.getLogger(__name__)
+
+TRAINING_COLUMNS = ['priority', 'category', 'urgency', 'duration']
+
+# Tasks users marked done, in completion order, after a (completed_at, id) watermark.
+# Served by TaskApp's idx_tasks_completed partial index.
+COMPLETED_QUERY = '''
+    SELECT id, priority, category, COALESCE(urgency, 0.5) AS urgency,
+           actual_duration AS duration, completed_at
+    FROM tasks
+    WHERE actual_duration IS NOT NULL
+      AND completed_at >= ?
+      AND (completed_at > ? OR (completed_at = ? AND id > ?))
+    ORDER BY completed_at, id
+'''
+
+# Every completed task with its owner, for per-user overlays
+USER_COMPLETED_QUERY = '''
+    SELECT user_id, priority, category, COALESCE(urgency, 0.5) AS urgency,
+           actual_duration AS duration
+    FROM tasks
+    WHERE actual_duration IS NOT NULL AND user_id IS NOT NULL
+'''
+
+
+class TrainingPipeline:
+    """Trains TaskDurationPredictor on tasks users marked done in tasks.db.
+
+    Rows are read through one cursor with fetchmany(chunk_size) and cleaned
+    chunk by chunk, keeping only the four training columns, so the table is
+    never loaded as a whole. The (completed_at, id) of the last row used is
+    stored in state_filename; update() only reads completions after it.
+    """
+
+    def __init__(self, database='tasks.db', state_filename='training_state.json', chunk_size=1000):
+        self.database = database
+        self.state_filename = state_filename
+        self.chunk_size = chunk_size
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=5)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def load_watermark(self):
+        try:
+            with open(self.state_filename) as file:
+                return json.load(file).get('watermark')
+        except (OSError, ValueError):
+            return None
+
+    def save_watermark(self, watermark):
+        tmp_filename = f"{self.state_filename}.tmp"
+        with open(tmp_filename, 'w') as file:
+            json.dump({'watermark': watermark}, file)
+        os.replace(tmp_filename, self.state_filename)
+
+    def iter_chunks(self, since=None):
+        """Yield DataFrames of up to chunk_size tasks completed after the since watermark"""
+        completed_at, last_id = since or ('', 0)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(COMPLETED_QUERY, (completed_at, completed_at, completed_at, last_id))
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def load_completed(self, predictor, since=None):
+        """Cleaned training rows for tasks completed after since, and the watermark after them"""
+        frames = []
+        watermark = since
+        for chunk in self.iter_chunks(since):
+            last = chunk.iloc[-1]
+            watermark = [last['completed_at'], int(last['id'])]
+            frames.append(predictor.clean_data(chunk[TRAINING_COLUMNS].copy()))
+        if not frames:
+            return pd.DataFrame(columns=TRAINING_COLUMNS), watermark
+        return pd.concat(frames, ignore_index=True), watermark
+
+    def train(self, predictor, csv_filename="tasks.csv"):
+        """Retrain from scratch on csv_filename (None to skip it) plus every completed task"""
+        completed, watermark = self.load_completed(predictor)
+        frames = [completed]
+        if csv_filename:
+            frames.insert(0, predictor.load_data(csv_filename)[TRAINING_COLUMNS])
+        data = pd.concat(frames, ignore_index=True)
+        logger.info("Training on %d rows (%d completed tasks)", len(data), len(completed))
+
+        trained = predictor.train(data=data)
+        if trained and watermark:
+            self.save_watermark(watermark)
+        return trained
+
+    def update(self, predictor, new_trees=10, max_trees=None, min_rows=10, csv_filename="tasks.csv"):
+        """Grow the forest with tasks completed since the last run.
+
+        Returns the update summary, or None when fewer than min_rows tasks
+        were completed since then (the watermark is left where it was so
+        they are picked up next time). Without a trained forest this runs
+        train() instead.
+        """
+        if not predictor.has_forest():
+            return self.train(predictor, csv_filename)
+
+        completed, watermark = self.load_completed(predictor, self.load_watermark())
+        if len(completed) < min_rows:
+            logger.info("Only %d newly completed tasks, skipping update", len(completed))
+            return None
+
+        summary = predictor.grow_forest(completed, new_trees, max_trees)
+        self.save_watermark(watermark)
+        return summary
+
+    def build_user_overlays(self, predictor, store):
+        """Rebuild every user's overlay in store from their completed tasks.
+
+        Residuals against the current global model are predicted one chunk
+        at a time and only their per (user, category) counts and sums are
+        kept. Returns the number of overlays written.
+        """
+        stats = {}  # user_id -> {category: [count, residual_sum]}
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(USER_COMPLETED_QUERY)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                tasks = [dict(zip(columns, row)) for row in rows]
+                for task, predicted in zip(tasks, predictor.predict_many(tasks)):
+                    category = str(task['category']).lower()
+                    entry = stats.setdefault(task['user_id'], {}).setdefault(category, [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += task['duration'] - float(predicted)
+
+        written = 0
+        for user_id, category_stats in stats.items():
+            overlay = store.build(user_id, category_stats)
+            if overlay is not None:
+                store.save(user_id, overlay)
+                written += 1
+        logger.info("Wrote %d user overlays (%d users with completed tasks)", written, len(stats))
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the duration model from completed tasks in tasks.db")
+    parser.add_argument('--database', default='tasks.db')
+    parser.add_argument('--model', default='task_model.pkl')
+    parser.add_argument('--state', default='training_state.json', help="watermark file for --update")
+    parser.add_argument('--csv', default='tasks.csv', help="base training data, '' to use completed tasks only")
+    parser.add_argument('--update', action='store_true', help="grow the forest with new completions only")
+    parser.add_argument('--new-trees', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--user-overlays', default='user_models',
+                        help="directory to rebuild per-user overlays in after training, '' to skip")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    pipeline = TrainingPipeline(args.database, args.state, args.chunk_size)
+    predictor = TaskDurationPredictor(model_filename=args.model)
+    if args.update:
+        pipeline.update(predictor, new_trees=args.new_trees, csv_filename=args.csv or None)
+    else:
+        pipeline.train(predictor, csv_filename=args.csv or None)
+    if args.user_overlays and predictor.has_forest():
+        pipeline.build_user_overlays(predictor, UserModelStore(args.user_overlays))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from LRUCache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MIN_DURATION, MAX_DURATION = 1, 240  # Same clamp as TaskDurationPredictor
+
+
+class UserModelStore:
+    """Per-user corrections on top of the global duration model.
+
+    A user's overlay is the mean residual (actual minus predicted minutes)
+    of their completed tasks, overall and per category. Each mean is shrunk
+    towards its parent (per category towards the user's overall offset,
+    which is shrunk towards 0), so a category with a handful of tasks only
+    moves the prediction a little. Users with fewer than min_samples
+    completed tasks get no overlay.
+
+    Overlays are a few numbers per user, stored one JSON file per user in
+    directory. They are loaded on first use and kept in an LRUCache of
+    maxsize users; ttl (seconds) makes workers pick up rebuilt files.
+    """
+
+    def __init__(self, directory='user_models', maxsize=1024, ttl=600, shrinkage=5.0, min_samples=10):
+        self.directory = directory
+        self.shrinkage = shrinkage
+        self.min_samples = min_samples
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def path(self, user_id):
+        return os.path.join(self.directory, f"{int(user_id)}.json")
+
+    def load(self, user_id):
+        """The user's overlay, or None if they have none"""
+        overlay = self.cache.get(user_id, False)
+        if overlay is not False:
+            return overlay
+        try:
+            with open(self.path(user_id)) as file:
+                overlay = json.load(file)
+        except FileNotFoundError:
+            overlay = None
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read overlay for user %s: %s", user_id, e)
+            overlay = None
+        self.cache.put(user_id, overlay)  # Cache misses too, so unknown users don't hit the disk
+        return overlay
+
+    def save(self, user_id, overlay):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self.path(user_id)
+        with open(f"{filename}.tmp", 'w') as file:
+            json.dump(overlay, file, indent=4)
+        os.replace(f"{filename}.tmp", filename)
+        self.cache.invalidate(user_id)
+
+    def build(self, user_id, category_stats):
+        """Overlay from {category: (count, residual_sum)}, or None below min_samples"""
+        samples = sum(count for count, _ in category_stats.values())
+        if samples < self.min_samples:
+            return None
+        offset = sum(total for _, total in category_stats.values()) / (samples + self.shrinkage)
+        categories = {
+            category: {
+                'offset': offset + (total - count * offset) / (count + self.shrinkage),
+                'samples': count
+            }
+            for category, (count, total) in category_stats.items()
+        }
+        return {
+            'user_id': int(user_id),
+            'samples': samples,
+            'offset': offset,
+            'categories': categories,
+            'built_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+    def adjust(self, user_id, tasks, durations):
+        """Apply the user's overlay to global predictions for tasks (dicts with a category)"""
+        overlay = self.load(user_id)
+        if overlay is None:
+            return durations
+        categories = overlay['categories']
+        adjusted = []
+        for task, duration in zip(tasks, durations):
+            category = categories.get(str(task.get('category', '')).lower())
+            offset = category['offset'] if category else overlay['offset']
+            adjusted.append(min(max(duration + offset, MIN_DURATION), MAX_DURATION))
+        return adjusted
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from add_tasks import generate_task, CATEGORY_WEIGHTS
+from DayScheduler import DayScheduler, Task as PlanTask
+from Scheduling import Scheduler
+from task import Task
+from TaskDurationPredictor import TaskDurationPredictor
+from Database import apply_pragmas
+
+# Configuration
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+SINGLE_PREDICTION_SAMPLE = 1000  # predict_duration calls timed per size
+BATCH_SIZE = 1000                # tasks per predict_many call
+RESULTS_DIR = "benchmarks"
+
+
+def generate_workload(size, seed=42):
+    """Synthetic tasks drawn from add_tasks.generate_task with its category weights"""
+    random.seed(seed)
+    categories = random.choices(
+        list(CATEGORY_WEIGHTS.keys()),
+        weights=list(CATEGORY_WEIGHTS.values()),
+        k=size
+    )
+    return [generate_task(category) for category in categories]
+
+
+def to_scheduler_tasks(workload):
+    tasks = []
+    for row in workload:
+        task = Task(row['name'], row['due_date'], row['priority'], row['category'])
+        task.time = timedelta(minutes=row['duration'])
+        tasks.append(task)
+    return tasks
+
+
+def to_plan_tasks(workload):
+    return [PlanTask(row['name'], row['priority'], row['category'], row['duration'], row['urgency'])
+            for row in workload]
+
+
+def time_runs(func, repeat):
+    """Run func repeat times and return each run's duration in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(name, size, samples, items_per_run):
+    samples_ms = np.array(samples) * 1000
+    p50 = float(np.percentile(samples_ms, 50))
+    return {
+        'benchmark': name,
+        'size': size,
+        'runs': len(samples),
+        'p50_ms': round(p50, 4),
+        'max_ms': round(float(samples_ms.max()), 4),  # A p99 needs far more runs than --repeat
+        'throughput_per_s': round(items_per_run / (p50 / 1000), 1) if p50 > 0 else None
+    }
+
+
+def bench_scheduler(workload, repeat):
+    tasks = to_scheduler_tasks(workload)
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    scheduler = Scheduler(tasks, start, start + timedelta(hours=8))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):  # It prints every placement
+            scheduler.calculate_amount_of_time()
+
+    return time_runs(run, repeat)
+
+
+def bench_day_scheduler(workload, repeat, mode):
+    tasks = to_plan_tasks(workload)
+    return time_runs(lambda: DayScheduler(tasks, 8, mode=mode).create_schedule(), repeat)
+
+
+def bench_predict_single(predictor, workload):
+    sample = workload[:SINGLE_PREDICTION_SAMPLE]
+    samples = []
+    for row in sample:
+        started = time.perf_counter()
+        predictor.predict_duration(row)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_predict_batched(predictor, workload):
+    samples = []
+    for i in range(0, len(workload), BATCH_SIZE):
+        batch = workload[i:i + BATCH_SIZE]
+        started = time.perf_counter()
+        predictor.predict_many(batch)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_persistence(workload, repeat, profile='wal'):
+    """Insert the workload into a scratch copy of the tasks table, like save_scheduled_tasks"""
+    rows = [(1, row['name'], row['priority'], row['category'], row['duration'], '09:00', '10:00')
+            for row in workload]
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(repeat):
+            conn = sqlite3.connect(os.path.join(tmp, f"bench_{run}.db"))
+            apply_pragmas(conn, profile)
+            conn.execute('''
+                CREATE TABLE tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    duration INTEGER NOT NULL,
+                    scheduled_date TEXT,
+                    start_time TEXT,
+                    end_time TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            started = time.perf_counter()
+            with conn:
+                conn.executemany('''
+                    INSERT INTO tasks
+                    (user_id, name, priority, category, duration, scheduled_date, start_time, end_time)
+                    VALUES (?, ?, ?, ?, ?, date('now'), ?, ?)
+                ''', rows)
+            samples.append(time.perf_counter() - started)
+            conn.close()
+    return samples
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, repeat, skip=()):
+    predictor = TaskDurationPredictor()
+    predictor.load_model()
+    results = []
+
+    for size in sizes:
+        print(f"\nGenerating {size} tasks...")
+        workload = generate_workload(size)
+
+        benchmarks = [
+            ('scheduler.calculate_amount_of_time', lambda: bench_scheduler(workload, repeat), size),
+            ('day_scheduler.greedy', lambda: bench_day_scheduler(workload, repeat, 'greedy'), size),
+            ('day_scheduler.approximate', lambda: bench_day_scheduler(workload, repeat, 'approximate'), size),
+            ('day_scheduler.auto', lambda: bench_day_scheduler(workload, repeat, 'auto'), size),
+            ('predictor.predict_duration', lambda: bench_predict_single(predictor, workload), 1),
+            ('predictor.predict_many', lambda: bench_predict_batched(predictor, workload), min(size, BATCH_SIZE)),
+            ('sqlite.executemany', lambda: bench_persistence(workload, repeat), size),
+        ]
+        for name, bench, items_per_run in benchmarks:
+            if any(name.startswith(prefix) for prefix in skip):
+                continue
+            result = summarize(name, size, bench(), items_per_run)
+            results.append(result)
+            print(f"{name:<36} n={size:<8} p50={result['p50_ms']:>10.3f}ms "
+                  f"max={result['max_ms']:>10.3f}ms {result['throughput_per_s']}/s")
+
+    return results
+
+
+def compare(results, baseline_file):
+    """Print p50 change against an earlier results file"""
+    with open(baseline_file) as file:
+        baseline = {(r['benchmark'], r['size']): r for r in json.load(file)['results']}
+
+    print(f"\n=== Compared with {baseline_file} ===")
+    for result in results:
+        before = baseline.get((result['benchmark'], result['size']))
+        if before and before['p50_ms'] > 0:
+            ratio = result['p50_ms'] / before['p50_ms']
+            print(f"{result['benchmark']:<36} n={result['size']:<8} {before['p50_ms']:>10.3f}ms -> "
+                  f"{result['p50_ms']:>10.3f}ms ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scheduling, prediction and persistence")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per timed benchmark")
+    parser.add_argument('--skip', nargs='*', default=[], help="benchmark name prefixes to skip")
+    parser.add_argument('--output', help="results file (default: benchmarks/<commit>-<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat, args.skip)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'results': results
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{(commit or 'unknown')[:8]}-{stamp}.json")
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
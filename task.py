@@ -49,9 +49,10 @@ class Task:
         
         raise ValueError("Invalid date format. Use 'MM/DD/YY', 'MM.DD.YY', or 'YYYY-MM-DD'.")
 
-    def calculate_urgency(self):
+    def calculate_urgency(self, today=None):
         """Calculate urgency based on priority and due date. This will be 0-1. The higher the number, the more urgent."""
-        days_until_due = (self.due_date - datetime.today()).days
+        today = today or datetime.today()
+        days_until_due = (self.due_date - today).days
         priority_value = self.PRIORITY_MAP.get(self.priority, 1)  # Default to low priority
 
         # Prevent division by zero (if due today)